@@ -8,16 +8,66 @@ if os.environ.get('FLASK_ENV') == 'production':
 
 import logging
 import atexit
-try:
-    import fcntl
-except ImportError:
-    fcntl = None
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, send_from_directory, jsonify
 from werkzeug.security import generate_password_hash
+from psycopg2.extras import execute_values
 from backend.api.config import config_by_name
 from backend.api.extensions import cors, jwt, scheduler, limiter
 from backend.api.helpers.encryption import initialize_fernet
-from backend.shared.db import init_pool, get_db_cursor, close_pool
+from backend.api.helpers.json_provider import OrjsonProvider
+from backend.shared.db import init_pool, get_db_cursor, close_pool, try_advisory_lock, pool_stats
+
+# Advisory lock held by whichever process runs the scheduler. Postgres sees every
+# worker and container, unlike a lock file in a per-container /tmp.
+SCHEDULER_LOCK_NAME = 'amazon-order-trends:scheduler'
+
+def start_scheduler_once(app):
+    """
+    Starts the scheduler in at most one process across all workers and hosts.
+    This is the only place the scheduler is started; calling it again in a
+    process that already runs the scheduler does nothing.
+    """
+    if scheduler.running:
+        return
+    try:
+        lock_conn = try_advisory_lock(SCHEDULER_LOCK_NAME)
+        if lock_conn is None:
+            app.logger.info("Scheduler already running in another worker (lock held).")
+            return
+
+        # The lock lives as long as this connection, so keep it for the process lifetime.
+        app.scheduler_lock_conn = lock_conn
+        atexit.register(lock_conn.close)
+
+        scheduler.start()
+        app.logger.info("Scheduler started by this worker.")
+    except Exception as e:
+        app.logger.error(f"Failed to start scheduler: {e}")
+
+def start_pool_stats_logging(app):
+    """
+    Logs this worker's database pool usage every DB_POOL_STATS_INTERVAL seconds,
+    so pool sizes can be tuned from real load. Under gevent the daemon thread is
+    a greenlet that sleeps between reports.
+    """
+    interval = app.config['DB_POOL_STATS_INTERVAL']
+    if interval <= 0:
+        return
+
+    def report():
+        while True:
+            time.sleep(interval)
+            stats = pool_stats()
+            if stats:
+                app.logger.info(
+                    f"DB pool (pid {os.getpid()}): {stats['in_use']} in use, {stats['idle']} idle, "
+                    f"{stats['max']} max; {stats['waits']} waits, {stats['timeouts']} timeouts since start."
+                )
+
+    threading.Thread(target=report, name='db-pool-stats', daemon=True).start()
 
 def create_app(config_name=None):
     """Application factory."""
@@ -35,11 +85,23 @@ def create_app(config_name=None):
         app.static_folder = static_folder_path
 
     app.config.from_object(config_by_name[config_name])
+    app.json = OrjsonProvider(app)
 
     # --- Initialize Database Pool ---
     init_pool()
     atexit.register(close_pool)
 
+    # --- Ingestion Workers ---
+    # Jobs run on a bounded pool so a burst of imports can't hold every pooled connection.
+    app.ingest_executor = ThreadPoolExecutor(
+        max_workers=app.config['INGESTION_MAX_WORKERS'], thread_name_prefix='ingest'
+    )
+    # Let in-flight and queued jobs finish on shutdown rather than leaving them 'running'.
+    atexit.register(app.ingest_executor.shutdown)
+    # Initial price scrapes for newly added tracked items, off the request path.
+    app.price_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='price')
+    atexit.register(app.price_executor.shutdown)
+
     # --- Initialize Extensions ---
     cors.init_app(app)
     jwt.init_app(app)
@@ -75,31 +137,11 @@ def create_app(config_name=None):
     app.logger.setLevel(logging.INFO)
     app.logger.propagate = False
 
+    start_pool_stats_logging(app)
+
     # Conditionally start the scheduler if environment variable is set
     if os.environ.get('SCHEDULER_AUTOSTART') == 'True':
-        if fcntl:
-            try:
-                # Open a lock file to ensure only one worker starts the scheduler
-                lock_file = open("/tmp/scheduler.lock", "w")
-                # Try to acquire an exclusive non-blocking lock.
-                # If another process holds the lock, this will raise an IOError (BlockingIOError).
-                fcntl.lockf(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
-
-                # Keep reference to the file object to prevent it from being closed/garbage-collected
-                app.scheduler_lock_file = lock_file
-
-                if not scheduler.running:
-                    scheduler.start()
-                    app.logger.info("Scheduler started by this worker.")
-            except IOError:
-                app.logger.info("Scheduler already running in another worker (lock held).")
-            except Exception as e:
-                app.logger.error(f"Failed to start scheduler: {e}")
-        else:
-            # Fallback for systems without fcntl (e.g., Windows development)
-            if not scheduler.running:
-                scheduler.start()
-                app.logger.info("Scheduler started (fcntl not available).")
+        start_scheduler_once(app)
 
     # --- Security Headers ---
     @app.after_request
@@ -166,19 +208,41 @@ def create_app(config_name=None):
                     app.logger.info("Database is up to date.")
                     return
 
+                migration_scripts = {}
                 for migration_file in migrations_to_apply:
-                    app.logger.info(f"Applying migration: {migration_file}...")
-                    try:
-                        with open(os.path.join(migrations_dir, migration_file), 'r') as f:
-                            sql_script = f.read()
+                    # 64KB buffer so large scripts are read with few syscalls
+                    with open(os.path.join(migrations_dir, migration_file), 'r', buffering=65536) as f:
+                        migration_scripts[migration_file] = f.read()
+
+                # 5. Apply all pending scripts in a single round trip. Each script is
+                # tagged and separated on its own line so a trailing comment in one
+                # file can't swallow the statement separator.
+                app.logger.info(f"Applying {len(migrations_to_apply)} migrations: {', '.join(migrations_to_apply)}")
+                combined_sql = "\n;\n".join(
+                    f"-- MIGRATION: {name}\n{script}" for name, script in migration_scripts.items()
+                )
+                cur.execute("SAVEPOINT batch_migrations")
+                try:
+                    cur.execute(combined_sql)
+                except Exception:
+                    # Re-run file by file to report which migration is broken.
+                    cur.execute("ROLLBACK TO SAVEPOINT batch_migrations")
+                    for migration_file, sql_script in migration_scripts.items():
+                        app.logger.info(f"Applying migration: {migration_file}...")
+                        try:
                             cur.execute(sql_script)
-                        
-                        cur.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (migration_file,))
-                        app.logger.info(f"Successfully applied and recorded migration: {migration_file}")
-                    except Exception as e:
-                        app.logger.error(f"Failed to apply migration {migration_file}: {e}")
-                        # The transaction will be rolled back by the 'with' context manager
-                        raise
+                        except Exception as e:
+                            app.logger.error(f"Failed to apply migration {migration_file}: {e}")
+                            # The transaction will be rolled back by the 'with' context manager
+                            raise
+
+                # 6. Record every applied migration with one INSERT
+                execute_values(
+                    cur,
+                    "INSERT INTO schema_migrations (version) VALUES %s",
+                    [(m,) for m in migrations_to_apply]
+                )
+                app.logger.info(f"Successfully applied and recorded {len(migrations_to_apply)} migrations.")
 
             app.logger.info("Database migration process finished successfully.")
         except Exception as e:
@@ -190,20 +254,35 @@ def create_app(config_name=None):
     def seed_admin_command():
         """Creates the initial admin user if no users exist in the database."""
         try:
-            with get_db_cursor(commit=True) as cur:
+            with get_db_cursor() as cur:
                 cur.execute("SELECT 1 FROM users LIMIT 1")
-                if cur.fetchone() is None:
-                    admin_user = "admin"
-                    admin_pass = "changeme"
-                    app.logger.info(f"No users found. Creating initial admin user: '{admin_user}'")
-                    hashed_password = generate_password_hash(admin_pass)
-                    cur.execute(
-                        "INSERT INTO users (username, hashed_password, role) VALUES (%s, %s, 'admin')",
-                        (admin_user, hashed_password)
-                    )
-                    app.logger.info("Initial admin user created successfully.")
-                else:
-                    app.logger.info("Users already exist. Skipping initial admin creation.")
+                has_users = cur.fetchone() is not None
+
+            if has_users:
+                app.logger.info("Users already exist. Skipping initial admin creation.")
+                return
+
+            admin_user = "admin"
+            admin_pass = "changeme"
+            app.logger.info(f"No users found. Creating initial admin user: '{admin_user}'")
+            # Hash before borrowing a connection for the INSERT; PBKDF2 is slow by design.
+            hashed_password = generate_password_hash(admin_pass)
+            with get_db_cursor(commit=True) as cur:
+                # Re-check in the INSERT itself in case another worker seeded meanwhile.
+                cur.execute(
+                    """
+                    INSERT INTO users (username, hashed_password, role)
+                    SELECT %s, %s, 'admin'
+                    WHERE NOT EXISTS (SELECT 1 FROM users)
+                    """,
+                    (admin_user, hashed_password)
+                )
+                created = cur.rowcount == 1
+
+            if created:
+                app.logger.info("Initial admin user created successfully.")
+            else:
+                app.logger.info("Users already exist. Skipping initial admin creation.")
         except Exception as e:
             app.logger.error(f"An error occurred during admin user seeding: {e}")
             raise
@@ -212,6 +291,14 @@ def create_app(config_name=None):
 
     # Conditionally serve static files in production
     if config_name == 'production':
+        # The frontend build doesn't change while the app runs, so index its files
+        # once instead of hitting the filesystem on every request.
+        app.static_files = frozenset(
+            os.path.relpath(os.path.join(root, name), app.static_folder).replace(os.sep, '/')
+            for root, _, files in os.walk(app.static_folder)
+            for name in files
+        )
+
         @app.route('/', defaults={'path': ''})
         @app.route('/<path:path>')
         def serve(path):
@@ -219,8 +306,7 @@ def create_app(config_name=None):
             if path.startswith('api/'):
                 return jsonify({"error": "Not Found"}), 404
             
-            full_path = os.path.join(app.static_folder, path)
-            if path != "" and os.path.exists(full_path) and os.path.isfile(full_path):
+            if path in app.static_files:
                 return send_from_directory(app.static_folder, path)
             else:
                 return send_from_directory(app.static_folder, 'index.html')
@@ -1,16 +1,52 @@
 import os
-from backend.api import create_app
-from backend.api.extensions import scheduler
-
-# Create the Flask app using the factory
-app = create_app()
 
 if __name__ == '__main__':
-    # Start the scheduler only when running the app directly
-    if not scheduler.running:
-        scheduler.start()
-    
-    # Use Gunicorn for production, but this is fine for local dev
+    # Running the app directly should also run the scheduler. create_app starts
+    # it through the same lock-guarded path the Gunicorn workers use.
+    os.environ.setdefault('SCHEDULER_AUTOSTART', 'True')
+
     host = os.environ.get('FLASK_RUN_HOST', '0.0.0.0')
     port = int(os.environ.get('FLASK_RUN_PORT', 5001))
-    app.run(host=host, port=port)
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        # Gunicorn doesn't run on Windows; fall back to the threaded dev server there.
+        from backend.api import create_app
+        create_app().run(host=host, port=port, threaded=True)
+    else:
+        class StandaloneApplication(BaseApplication):
+            """
+            Serves the app with the same gevent workers as production, so local
+            runs handle requests concurrently instead of one at a time.
+            """
+
+            def __init__(self, options):
+                self.options = options
+                super().__init__()
+
+            def load_config(self):
+                for key, value in self.options.items():
+                    self.cfg.set(key, value)
+
+            def load(self):
+                # Runs in each worker after Gunicorn's gevent monkey patching, so
+                # the app (and its connection pool) is created per worker. The app
+                # package is only imported here: importing it in the master would
+                # load threading, psycopg2 etc. before the workers patch them.
+                from psycogreen.gevent import patch_psycopg
+                patch_psycopg()
+                from backend.api import create_app
+                return create_app()
+
+        StandaloneApplication({
+            'bind': f'{host}:{port}',
+            'workers': 2,
+            'worker_class': 'gevent',
+            'timeout': 120,
+        }).run()
+else:
+    from backend.api import create_app
+
+    # Create the Flask app using the factory
+    app = create_app()
@@ -14,6 +14,10 @@ class Config:
     
     # Custom config
     ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY')
+    # Ingestion jobs beyond this many per worker wait in a queue
+    INGESTION_MAX_WORKERS = int(os.environ.get('INGESTION_MAX_WORKERS', 2))
+    # How often each worker logs its database pool usage; 0 disables it
+    DB_POOL_STATS_INTERVAL = int(os.environ.get('DB_POOL_STATS_INTERVAL', 300))
 
 class DevelopmentConfig(Config):
     """Development configuration."""
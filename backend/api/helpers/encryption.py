@@ -1,20 +1,26 @@
 import os
 import base64
 import hashlib
+import functools
 from cryptography.fernet import Fernet
 
 fernet = None
 
+@functools.lru_cache(maxsize=1)
+def _derive_fernet(encryption_key):
+    """Derives the Fernet instance for a key once; repeated app factory calls reuse it."""
+    key_digest = hashlib.sha256(encryption_key.encode('utf-8')).digest()
+    derived_key = base64.urlsafe_b64encode(key_digest)
+    return Fernet(derived_key)
+
 def initialize_fernet(app):
     """Initializes the Fernet instance from the app's configuration."""
     global fernet
     encryption_key = app.config.get('ENCRYPTION_KEY')
     if not encryption_key:
         raise ValueError("ENCRYPTION_KEY is not set in the application configuration.")
-    
-    key_digest = hashlib.sha256(encryption_key.encode('utf-8')).digest()
-    derived_key = base64.urlsafe_b64encode(key_digest)
-    fernet = Fernet(derived_key)
+
+    fernet = _derive_fernet(encryption_key)
 
 def get_fernet():
     """Returns the initialized Fernet instance."""
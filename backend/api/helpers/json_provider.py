@@ -0,0 +1,60 @@
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Output matches Flask's default provider: keys are sorted, and dates,
+    Decimals and other non-native types still go through Flask's `default`
+    (dates as RFC 822 strings). Calls with json.dumps arguments orjson can't
+    express, and values it rejects such as integers beyond 64 bits, fall back
+    to the stdlib encoder.
+    """
+
+    def _orjson_option(self, kwargs):
+        """Maps json.dumps arguments to orjson options, or None if orjson can't honor them."""
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.pop('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        indent = kwargs.pop('indent', None)
+        if indent is not None:
+            if indent != 2:
+                return None
+            option |= orjson.OPT_INDENT_2
+        # orjson output is always compact and UTF-8; both are valid JSON for clients.
+        kwargs.pop('separators', None)
+        kwargs.pop('ensure_ascii', None)
+        kwargs.pop('default', None)
+        return None if kwargs else option
+
+    def _orjson_dumps(self, obj, kwargs):
+        option = self._orjson_option(dict(kwargs))
+        if option is None:
+            return None
+        try:
+            return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option)
+        except orjson.JSONEncodeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        encoded = self._orjson_dumps(obj, kwargs)
+        if encoded is None:
+            return super().dumps(obj, **kwargs)
+        return encoded.decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Like the default provider's response(), but writes orjson's bytes directly."""
+        obj = self._prepare_response_obj(args, kwargs)
+        dump_args = {}
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args['indent'] = 2
+        encoded = self._orjson_dumps(obj, dump_args)
+        if encoded is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(encoded + b"\n", mimetype=self.mimetype)
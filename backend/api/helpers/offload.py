@@ -0,0 +1,27 @@
+from gevent import monkey
+
+# CPU-heavy calls (password hashing) get their own small pool of native threads,
+# so a burst of logins can't starve the hub's shared pool, which gevent also
+# uses for DNS lookups. Created lazily so each forked worker builds its own.
+CPU_BOUND_THREADS = 4
+_cpu_pool = None
+
+def _get_cpu_pool():
+    global _cpu_pool
+    if _cpu_pool is None:
+        from gevent.threadpool import ThreadPool
+        _cpu_pool = ThreadPool(CPU_BOUND_THREADS)
+    return _cpu_pool
+
+def run_cpu_bound(fn, *args):
+    """
+    Runs a CPU-heavy call without stalling the other requests on this worker.
+
+    Under gevent (production), the call runs on a native thread from a dedicated
+    pool while the calling greenlet waits, so the event loop keeps serving other
+    greenlets. Work like PBKDF2 releases the GIL and so runs in parallel. Without
+    gevent, the call simply runs inline.
+    """
+    if monkey.is_module_patched('threading'):
+        return _get_cpu_pool().apply(fn, args)
+    return fn(*args)
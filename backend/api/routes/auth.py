@@ -1,11 +1,34 @@
+import hashlib
+import hmac
+import os
 from flask import Blueprint, request, jsonify
 from werkzeug.security import check_password_hash
 from flask_jwt_extended import create_access_token
 from backend.shared.db import get_db_cursor
 from backend.api.extensions import limiter
+from backend.api.helpers.ttl_cache import TTLCache
+from backend.api.helpers.offload import run_cpu_bound
 
 auth_bp = Blueprint('auth_bp', __name__)
 
+# Recent password verifications are remembered briefly so repeated logins don't
+# each pay for a full PBKDF2 check. Keys include the stored hash, so a password
+# change invalidates them, and the password is only kept as a keyed digest
+# under a per-process secret.
+_verify_cache = TTLCache(maxsize=4096, ttl=30)
+_verify_pepper = os.urandom(32)
+
+def _verify_password(username, hashed_password, password):
+    """check_password_hash with a short-lived cache of the result."""
+    password_digest = hmac.new(_verify_pepper, password.encode('utf-8'), hashlib.sha256).digest()
+    key = (username, hashed_password, password_digest)
+    result = _verify_cache.get(key)
+    if result is None:
+        # PBKDF2 takes a few hundred ms of CPU; keep it off the gevent loop.
+        result = run_cpu_bound(check_password_hash, hashed_password, password)
+        _verify_cache.set(key, result)
+    return result
+
 @auth_bp.route("/api/auth/login", methods=['POST'])
 @limiter.limit("5 per minute")
 def login():
@@ -16,7 +39,7 @@ def login():
         cur.execute("SELECT id, hashed_password, role FROM users WHERE username = %s", (username,))
         user = cur.fetchone()
 
-    if user and check_password_hash(user[1], password):
+    if user and password is not None and _verify_password(username, user[1], password):
         user_id = str(user[0])
         user_role = user[2]
         additional_claims = {"role": user_role}
@@ -1,48 +1,48 @@
+import weakref
 from flask import Blueprint, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from backend.shared.db import get_db_cursor
+from backend.api.services.dashboard_service import get_cached_summary, cache_summary
 import json
 
 dashboard_bp = Blueprint('dashboard_bp', __name__)
 
+# The summary query is parsed and planned once per pooled connection with
+# PREPARE; later requests on that connection only EXECUTE it. Prepared
+# statements live for the whole session (they survive ROLLBACK), so each
+# connection only needs preparing the first time it serves this endpoint.
+_SQL_PREPARE_DASHBOARD_SUMMARY = """
+PREPARE dashboard_summary(uuid) AS
+WITH MonthlySpending AS (
+    -- Maintained by the ingestion job; one row per user and month
+    SELECT month, total_spending, order_count
+    FROM user_monthly_spending
+    WHERE user_id = $1
+)
+SELECT
+    (SELECT SUM(total_spending) FROM MonthlySpending),
+    (SELECT SUM(order_count) FROM MonthlySpending),
+    (SELECT json_agg(json_build_object('month', TO_CHAR(month, 'YYYY-MM'), 'total_spending', total_spending) ORDER BY month) FROM MonthlySpending),
+    (SELECT updated_at FROM ingestion_jobs WHERE user_id = $1 AND status = 'completed' ORDER BY updated_at DESC LIMIT 1)
+"""
+
+_prepared_connections = weakref.WeakSet()
+
 @dashboard_bp.route('/api/dashboard/summary', methods=['GET'])
 @jwt_required()
 def get_dashboard_summary():
     current_user_id = get_jwt_identity()
 
-    query = """
-    WITH UserOrders AS (
-        SELECT 
-            order_id,
-            (grand_total - COALESCE(refund_total, 0.0)) AS net_total,
-            DATE_TRUNC('month', order_placed_date) AS month
-        FROM orders
-        WHERE user_id = %s
-    ),
-    MonthlySpending AS (
-        SELECT
-            month,
-            SUM(net_total) AS total_spending
-        FROM UserOrders
-        GROUP BY month
-        ORDER BY month
-    ),
-    TotalStats AS (
-        SELECT
-            SUM(net_total) AS total_spending,
-            COUNT(order_id) AS total_orders
-        FROM UserOrders
-    )
-    SELECT
-        (SELECT total_spending FROM TotalStats),
-        (SELECT total_orders FROM TotalStats),
-        (SELECT json_agg(json_build_object('month', TO_CHAR(month, 'YYYY-MM'), 'total_spending', total_spending)) FROM MonthlySpending),
-        (SELECT updated_at FROM ingestion_jobs WHERE user_id = %s AND status = 'completed' ORDER BY updated_at DESC LIMIT 1)
-    """
+    cached = get_cached_summary(current_user_id)
+    if cached is not None:
+        return jsonify(cached)
 
     try:
         with get_db_cursor() as cur:
-            cur.execute(query, (current_user_id, current_user_id))
+            if cur.connection not in _prepared_connections:
+                cur.execute(_SQL_PREPARE_DASHBOARD_SUMMARY)
+                _prepared_connections.add(cur.connection)
+            cur.execute("EXECUTE dashboard_summary(%s)", (current_user_id,))
             result = cur.fetchone()
 
         if not result:
@@ -59,12 +59,14 @@ def get_dashboard_summary():
         if spending_trend is None:
             spending_trend = []
 
-        return jsonify({
+        summary = {
             "total_spending": float(total_spending) if total_spending else 0,
             "total_orders": int(total_orders) if total_orders else 0,
             "spending_trend": spending_trend,
             "last_sync_time": last_sync_time.isoformat() if last_sync_time else None
-        })
+        }
+        cache_summary(current_user_id, summary)
+        return jsonify(summary)
 
     except Exception as e:
         current_app.logger.error(f"Failed to fetch dashboard summary: {e}", exc_info=True)
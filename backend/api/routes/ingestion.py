@@ -1,19 +1,69 @@
-import json
-import threading
-import subprocess
+import select
 import re
+from collections import deque
 from datetime import datetime, timedelta, time
-from flask import Blueprint, request, jsonify, current_app, Response
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from psycopg2 import sql
 
-from backend.shared.db import get_db_cursor
+from backend.shared.db import get_db_cursor, get_dedicated_connection
 from backend.api.helpers.decorators import admin_required
 from backend.api.services.ingestion_service import (
-    run_manual_ingestion_job,
+    create_job,
+    submit_ingestion_job,
+    ingestion_job_channel,
+    MAX_LOG_LINES,
 )
 
 ingestion_bp = Blueprint('ingestion_bp', __name__)
 
+# Idle streams send a comment line this often so proxies keep them open.
+STREAM_KEEPALIVE_SECONDS = 15
+
+# Only the parts of the 'details' JSON the frontend uses are extracted, server-side,
+# so the rest of the document is neither sent nor parsed. Log lines come from the
+# tail of ingestion_log; jobs that haven't written to it yet (pending, or from
+# before the table existed) fall back to the log kept in 'details'.
+_SQL_JOB_STATUS_COLUMNS = f"""
+    j.id, j.status, j.progress,
+    COALESCE(l.lines, j.details->'log'), j.details->'error',
+    COALESCE(GREATEST(l.total - {MAX_LOG_LINES}, 0), (j.details->>'log_dropped')::int, 0),
+    j.notification_seen
+"""
+_SQL_JOB_LOG_TAIL = f"""
+    LEFT JOIN LATERAL (
+        SELECT jsonb_agg(line ORDER BY seq) AS lines, MAX(total) AS total
+        FROM (
+            SELECT seq, line, COUNT(*) OVER () AS total
+            FROM ingestion_log
+            WHERE job_id = j.id
+            ORDER BY seq DESC
+            LIMIT {MAX_LOG_LINES}
+        ) tail
+    ) l ON TRUE
+"""
+_SQL_SELECT_JOB = f"SELECT {_SQL_JOB_STATUS_COLUMNS} FROM ingestion_jobs j {_SQL_JOB_LOG_TAIL} WHERE j.id = %s AND j.user_id = %s"
+
+def _job_status_payload(job_id, status, progress, log, error, log_dropped, notification_seen):
+    """Shapes a job row into the flat object the frontend expects."""
+    show_notification = (status == 'completed' and not notification_seen)
+
+    # Long jobs only keep the tail of their log; note how much was trimmed.
+    log = list(log or [])
+    if log_dropped:
+        log = [f"... {log_dropped} earlier log lines omitted ..."] + log
+
+    # The frontend expects a flat object with 'log' and 'error' keys.
+    return {
+        "id": job_id,
+        "status": status,
+        "progress": progress or {"value": 0, "max": 100},
+        "log": log,
+        "error": error,
+        "show_notification": show_notification,
+        "notification_seen": notification_seen
+    }
+
 @ingestion_bp.route("/api/ingestion/run", methods=['POST'])
 @jwt_required()
 def run_ingestion_route():
@@ -22,33 +72,16 @@ def run_ingestion_route():
     days = data.get('days', 60)
     debug = data.get('debug', False)
 
-    # Check if a job is already running for this user
-    with get_db_cursor() as cur:
-        cur.execute(
-            "SELECT id FROM ingestion_jobs WHERE user_id = %s AND status = 'running' AND job_type = 'manual'",
-            (current_user_id,)
-        )
-        if cur.fetchone():
-            return jsonify({"error": "An import is already in progress for this user."}), 409
-
-    # Create a new job record in the database
     with get_db_cursor(commit=True) as cur:
-        cur.execute(
-            """
-            INSERT INTO ingestion_jobs (user_id, job_type, status, details)
-            VALUES (%s, 'manual', 'pending', %s) RETURNING id
-            """,
-            (current_user_id, json.dumps({'log': ['Job created...']}))
-        )
-        job_id = cur.fetchone()[0]
-
-    app = current_app._get_current_object()
-    thread = threading.Thread(
-        target=run_manual_ingestion_job,
-        kwargs={'app': app, 'user_id': current_user_id, 'job_id': job_id, 'days': days, 'debug': debug, 'job_type': 'manual'}
+        job_id = create_job(cur, current_user_id, 'manual', 'Job created...')
+
+    if job_id is None:
+        return jsonify({"error": "An import is already in progress for this user."}), 409
+
+    submit_ingestion_job(
+        current_app._get_current_object(),
+        user_id=current_user_id, job_id=job_id, days=days, debug=debug, job_type='manual'
     )
-    thread.daemon = True
-    thread.start()
 
     return jsonify({"message": "Manual import process started.", "job_id": job_id}), 202
 
@@ -62,18 +95,15 @@ def get_manual_ingestion_status():
     with get_db_cursor(commit=True) as cur:
         # If job_id is provided, fetch that specific job.
         if job_id_param:
-            cur.execute(
-                "SELECT id, status, progress, details, notification_seen FROM ingestion_jobs WHERE id = %s AND user_id = %s",
-                (job_id_param, current_user_id)
-            )
+            cur.execute(_SQL_SELECT_JOB, (job_id_param, current_user_id))
             job_record = cur.fetchone()
         # If no job_id, fetch the latest running or most recently completed manual job for the user.
         else:
             cur.execute(
-                """
-                SELECT id, status, progress, details, notification_seen FROM ingestion_jobs
-                WHERE user_id = %s AND job_type = 'manual'
-                ORDER BY created_at DESC
+                f"""
+                SELECT {_SQL_JOB_STATUS_COLUMNS} FROM ingestion_jobs j {_SQL_JOB_LOG_TAIL}
+                WHERE j.user_id = %s AND j.job_type = 'manual'
+                ORDER BY j.created_at DESC
                 LIMIT 1
                 """,
                 (current_user_id,)
@@ -83,33 +113,111 @@ def get_manual_ingestion_status():
         if not job_record:
             return jsonify(None)
 
-        job_id, status, progress, details, notification_seen = job_record
+        return jsonify(_job_status_payload(*job_record))
 
-        show_notification = (status == 'completed' and not notification_seen)
 
-        # The frontend expects a flat object with 'log' and 'error' keys.
-        # We construct this object from the 'details' JSON field.
-        response_data = {
-            "id": job_id,
-            "status": status,
-            "progress": progress or {"value": 0, "max": 100},
-            "log": details.get('log', []),
-            "error": details.get('error'),
-            "show_notification": show_notification,
-            "notification_seen": notification_seen
-        }
+@ingestion_bp.route("/api/ingestion/manual/stream", methods=['GET'])
+@jwt_required()
+def stream_manual_ingestion_status():
+    """
+    Server-sent events alternative to polling /api/ingestion/manual/status.
+
+    Sends the job's current state, then a fresh state each time the ingestion
+    worker publishes an update on the job's NOTIFY channel, and closes once the
+    job completes or fails. While no updates arrive, the job's status is
+    re-checked every STREAM_KEEPALIVE_SECONDS. Updates carry only the new log lines, so the job row
+    is not re-read on every change. EventSource can't set headers, so clients
+    pass the JWT as the `token` query parameter.
+    """
+    current_user_id = get_jwt_identity()
+    job_id = request.args.get('job_id')
+    if not job_id:
+        return jsonify({"error": "job_id is required."}), 400
 
-        return jsonify(response_data)
+    with get_db_cursor() as cur:
+        cur.execute("SELECT 1 FROM ingestion_jobs WHERE id = %s AND user_id = %s", (job_id, current_user_id))
+        if not cur.fetchone():
+            return jsonify({"error": "Job not found."}), 404
+
+    def generate():
+        # LISTEN holds its connection for the whole job, so use one outside the pool.
+        with get_dedicated_connection() as conn:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("LISTEN {}").format(sql.Identifier(ingestion_job_channel(job_id))))
+
+                def load_state():
+                    # Read after LISTEN so no update published in between is missed.
+                    cur.execute(_SQL_SELECT_JOB, (job_id, current_user_id))
+                    _, status, progress, log, error, log_dropped, notification_seen = cur.fetchone()
+                    return {
+                        "status": status,
+                        "progress": progress,
+                        "log": deque(log or [], maxlen=MAX_LOG_LINES),
+                        "log_dropped": log_dropped,
+                        "error": error,
+                        "notification_seen": notification_seen,
+                    }
+
+                def event(state):
+                    payload = _job_status_payload(
+                        job_id, state['status'], state['progress'], state['log'], state['error'],
+                        state['log_dropped'], state['notification_seen']
+                    )
+                    # The app's orjson provider; long jobs send up to MAX_LOG_LINES lines per event.
+                    return f"data: {current_app.json.dumps(payload)}\n\n"
+
+                state = load_state()
+                yield event(state)
+
+                while state['status'] not in ('completed', 'failed'):
+                    if select.select([conn], [], [], STREAM_KEEPALIVE_SECONDS) == ([], [], []):
+                        # A job can also end without publishing, e.g. when it is failed as
+                        # orphaned, so a quiet stream re-checks the status before idling on.
+                        cur.execute("SELECT status FROM ingestion_jobs WHERE id = %s", (job_id,))
+                        row = cur.fetchone()
+                        if row is None:
+                            return
+                        if row[0] != state['status']:
+                            state = load_state()
+                            yield event(state)
+                        else:
+                            yield ": keepalive\n\n"
+                        continue
+
+                    conn.poll()
+                    while conn.notifies:
+                        update = current_app.json.loads(conn.notifies.pop(0).payload)
+                        if update.get('resync'):
+                            state = load_state()
+                            continue
+                        state['log'].extend(update.get('lines', []))
+                        for key in ('status', 'progress', 'log_dropped', 'error'):
+                            if key in update:
+                                state[key] = update[key]
+                    yield event(state)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    # Stop proxies (e.g. nginx) from buffering the stream.
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @ingestion_bp.route("/api/amazon-logout", methods=['POST'])
 @jwt_required()
 def amazon_logout():
+    # Deferred so the amazon-orders client isn't loaded at API startup.
+    from amazonorders.conf import AmazonOrdersConfig
+    from amazonorders.session import AmazonSession
+
     try:
-        result = subprocess.run(["amazon-orders", "logout"], capture_output=True, text=True, check=True)
-        return jsonify({"message": "Amazon session logout successful.", "output": result.stdout}), 200
+        # Same as `amazon-orders logout`, without starting a CLI subprocess:
+        # a session on the default config signs out and clears the shared cookie jar.
+        AmazonSession(config=AmazonOrdersConfig()).logout()
+        return jsonify({"message": "Amazon session logout successful.", "output": "Info: Successfully logged out of Amazon.\n"}), 200
     except Exception as e:
-        current_app.logger.error(f"Amazon logout command failed: {e}", exc_info=True)
+        current_app.logger.error(f"Amazon logout failed: {e}", exc_info=True)
         return jsonify({"error": "Failed to execute Amazon logout command."}), 500
 
 
@@ -50,7 +50,8 @@ def get_all_items():
             # Execute data query
             data_params = params + [limit, offset]
             cur.execute(query, data_params)
-            items = [dict(zip([desc[0] for desc in cur.description], row)) for row in cur.fetchall()]
+            columns = [desc[0] for desc in cur.description]
+            items = [dict(zip(columns, row)) for row in cur.fetchall()]
 
         return jsonify({
             "data": items,
@@ -141,7 +142,8 @@ def get_repeat_items():
     try:
         with get_db_cursor() as cur:
             cur.execute(base_query, tuple(params))
-            items = [dict(zip([desc[0] for desc in cur.description], row)) for row in cur.fetchall()]
+            columns = [desc[0] for desc in cur.description]
+            items = [dict(zip(columns, row)) for row in cur.fetchall()]
         return jsonify(items)
     except Exception as e:
         current_app.logger.error(f"Failed to fetch repeat items: {e}", exc_info=True)
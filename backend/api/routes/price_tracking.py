@@ -1,16 +1,22 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from psycopg2.extras import RealDictCursor
 from backend.shared.db import get_db_cursor
-from backend.api.services.price_service import get_amazon_price
-from datetime import datetime
+from backend.api.services.price_service import submit_new_item_price_check
+from urllib.parse import urlparse
 import re
 
 price_tracking_bp = Blueprint('price_tracking_bp', __name__)
 
+_ASIN_RE = re.compile(r'/(dp|gp/product)/(\w{10})')
+# Allow amazon.com, www.amazon.com, and a.co (the amazon shortlink)
+_ALLOWED_DOMAINS = frozenset(['amazon.com', 'www.amazon.com', 'a.co'])
+_SHORTLINK_DOMAIN = 'a.co'
+
 def extract_asin(url):
     """Extracts the ASIN from an Amazon product URL."""
     if not url: return None
-    match = re.search(r'/(dp|gp/product)/(\w{10})', url)
+    match = _ASIN_RE.search(url)
     return match.group(2) if match else None
 
 @price_tracking_bp.route("/api/tracked-items", methods=['POST'])
@@ -25,65 +31,51 @@ def add_tracked_item():
     if not url:
         return jsonify({"error": "URL is required"}), 400
 
-    from urllib.parse import urlparse
     try:
         parsed_url = urlparse(url)
-        # Allow amazon.com, www.amazon.com, and a.co (the amazon shortlink)
-        allowed_domains = ['amazon.com', 'www.amazon.com', 'a.co']
-        if parsed_url.netloc not in allowed_domains or parsed_url.scheme not in ['http', 'https']:
+        if parsed_url.netloc not in _ALLOWED_DOMAINS or parsed_url.scheme not in ['http', 'https']:
             return jsonify({"error": "Invalid Amazon URL."}), 400
     except Exception:
         return jsonify({"error": "Invalid URL format."}), 400
 
     # Extract ASIN
     asin = extract_asin(url)
-
-    # Check if already tracked by this user
-    with get_db_cursor() as cur:
-        # Check by URL or ASIN if available
-        if asin:
-            cur.execute("SELECT id FROM tracked_items WHERE user_id = %s AND asin = %s", (current_user_id, asin))
-        else:
-            cur.execute("SELECT id FROM tracked_items WHERE user_id = %s AND url = %s", (current_user_id, url))
-
-        if cur.fetchone():
-            return jsonify({"error": "Item already tracked"}), 409
-
-    # Scrape initial price
-    price, title, currency = get_amazon_price(url)
+    # Only shortlinks can point at a product without naming its ASIN; other
+    # amazon.com pages (search, cart, ...) have no price to track.
+    if not asin and parsed_url.netloc != _SHORTLINK_DOMAIN:
+        return jsonify({"error": "URL is not an Amazon product page."}), 400
 
     try:
         with get_db_cursor(commit=True) as cur:
+            # The unique indexes on (user_id, asin) and (user_id, url) turn an already
+            # tracked item into an empty result instead of a separate lookup.
             cur.execute("""
                 INSERT INTO tracked_items (user_id, asin, url, name, current_price, currency, last_checked, notification_threshold_type, notification_threshold_value)
-                VALUES (%s, %s, %s, %s, %s, %s, NOW(), %s, %s)
-                RETURNING id, name, current_price, currency
-            """, (current_user_id, asin, url, title, price, currency, notification_threshold_type, notification_threshold_value))
+                VALUES (%s, %s, %s, NULL, NULL, NULL, NULL, %s, %s)
+                ON CONFLICT DO NOTHING
+                RETURNING id
+            """, (current_user_id, asin, url, notification_threshold_type, notification_threshold_value))
 
             new_item_row = cur.fetchone()
-            # Convert row to dict for easy access or just use indices
-            # new_item_row: (id, name, current_price, currency)
+            if not new_item_row:
+                return jsonify({"error": "Item already tracked"}), 409
+
             item_id = new_item_row[0]
-            name = new_item_row[1]
-            current_price = new_item_row[2]
-            currency_val = new_item_row[3]
 
-            if price is not None:
-                cur.execute("""
-                    INSERT INTO price_history (tracked_item_id, price)
-                    VALUES (%s, %s)
-                """, (item_id, price))
+        # The name and price are scraped in the background; last_checked stays
+        # empty until they're recorded, which the frontend polls for.
+        submit_new_item_price_check(current_app._get_current_object(), item_id, url)
 
         return jsonify({
             "id": item_id,
-            "name": name,
+            "name": None,
             "url": url,
             "asin": asin,
-            "current_price": current_price,
-            "currency": currency_val,
+            "current_price": None,
+            "currency": None,
             "notification_threshold_type": notification_threshold_type,
             "notification_threshold_value": notification_threshold_value,
-            "last_checked": datetime.now().isoformat(),
+            "last_checked": None,
             "message": "Item added successfully"
         }), 201
 
@@ -91,6 +83,16 @@ def add_tracked_item():
         current_app.logger.error(f"Failed to add tracked item: {e}")
         return jsonify({"error": "Failed to add item"}), 500
 
+# Fingerprint of the tracked item list, read from the items alone: recording a
+# price updates its item and every update bumps updated_at, so the count and
+# the latest updated_at move whenever an item, or the prices shown for it,
+# change. Pruned history rows show up with the next price check.
+_SQL_TRACKED_ITEMS_VERSION = """
+    SELECT md5(concat_ws(':', COUNT(*), MAX(updated_at)))
+    FROM tracked_items
+    WHERE user_id = %s
+"""
+
 @price_tracking_bp.route("/api/tracked-items", methods=['GET'])
 @jwt_required()
 def get_tracked_items():
@@ -98,6 +100,16 @@ def get_tracked_items():
 
     try:
         with get_db_cursor() as cur:
+            # Repeat loads of an unchanged list are answered with 304 before the
+            # full query runs or anything is serialized.
+            cur.execute(_SQL_TRACKED_ITEMS_VERSION, (current_user_id,))
+            version = cur.fetchone()[0]
+            if request.if_none_match.contains_weak(version):
+                response = current_app.response_class(status=304)
+                response.set_etag(version, weak=True)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+
             cur.execute("""
                 SELECT t.id, t.asin, t.url, t.name, t.current_price, t.currency, t.last_checked,
                        t.notification_threshold_type, t.notification_threshold_value, t.is_custom_name,
@@ -108,15 +120,29 @@ def get_tracked_items():
                            GROUP BY price
                            ORDER BY COUNT(*) DESC, MIN(recorded_at) ASC
                            LIMIT 1
-                       ) as normal_price
+                       ) as normal_price,
+                       lp.price as latest_price, lp.recorded_at as latest_price_at
                 FROM tracked_items t
+                -- Latest recorded price per item in the same query, one index lookup each
+                LEFT JOIN LATERAL (
+                    SELECT price, recorded_at
+                    FROM price_history
+                    WHERE tracked_item_id = t.id
+                    ORDER BY recorded_at DESC
+                    LIMIT 1
+                ) lp ON TRUE
                 WHERE t.user_id = %s
                 ORDER BY t.created_at DESC
             """, (current_user_id,))
 
-            items = [dict(zip([desc[0] for desc in cur.description], row)) for row in cur.fetchall()]
+            columns = [desc[0] for desc in cur.description]
+            items = [dict(zip(columns, row)) for row in cur.fetchall()]
 
-        return jsonify(items)
+        response = jsonify(items)
+        response.set_etag(version, weak=True)
+        # Browsers keep the list but revalidate it (If-None-Match) on every load.
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
         current_app.logger.error(f"Failed to fetch tracked items: {e}")
         return jsonify({"error": "Failed to fetch items"}), 500
@@ -146,7 +172,7 @@ def get_tracked_item_details(item_id):
         bucket_unit = 'day'
 
     try:
-        with get_db_cursor() as cur:
+        with get_db_cursor(cursor_factory=RealDictCursor) as cur:
             # Get item details
             cur.execute("""
                 SELECT id, asin, url, name, current_price, currency, last_checked,
@@ -155,30 +181,33 @@ def get_tracked_item_details(item_id):
                 WHERE id = %s AND user_id = %s
             """, (item_id, current_user_id))
 
-            item_row = cur.fetchone()
-            if not item_row:
+            item = cur.fetchone()
+            if not item:
                 return jsonify({"error": "Item not found"}), 404
 
-            item = dict(zip([desc[0] for desc in cur.description], item_row))
-
             # Get price history
-            # Dynamic query for bucketing
+            # Dynamic query for bucketing: the last price recorded in each bucket.
+            # Rows come off the (tracked_item_id, recorded_at) index in time order, and
+            # LEAD finds each bucket's last row in that order, so unlike DISTINCT ON
+            # over (bucket, recorded_at DESC) nothing has to be sorted.
             query = """
-                SELECT DISTINCT ON (bucket) price, recorded_at
+                SELECT price, recorded_at
                 FROM (
-                    SELECT price, recorded_at, date_trunc(%s, recorded_at) as bucket
-                    FROM price_history
-                    WHERE tracked_item_id = %s
-                      AND recorded_at >= NOW() - CAST(%s AS INTERVAL)
+                    SELECT price, recorded_at, bucket, LEAD(bucket) OVER (ORDER BY recorded_at) AS next_bucket
+                    FROM (
+                        SELECT price, recorded_at, date_trunc(%s, recorded_at) as bucket
+                        FROM price_history
+                        WHERE tracked_item_id = %s
+                          AND recorded_at >= NOW() - CAST(%s AS INTERVAL)
+                    ) ranged
                 ) sub
-                ORDER BY bucket ASC, recorded_at DESC
+                WHERE next_bucket IS DISTINCT FROM bucket
+                ORDER BY recorded_at ASC
             """
 
             cur.execute(query, (bucket_unit, item_id, interval))
 
-            history = [dict(zip([desc[0] for desc in cur.description], row)) for row in cur.fetchall()]
-
-            item['history'] = history
+            item['history'] = cur.fetchall()
 
         return jsonify(item)
     except Exception as e:
@@ -196,7 +225,7 @@ def update_tracked_item(item_id):
         return jsonify({"error": "Name is required"}), 400
 
     try:
-        with get_db_cursor(commit=True) as cur:
+        with get_db_cursor(commit=True, cursor_factory=RealDictCursor) as cur:
             # Mark name as custom since it's being manually updated
             update_fields = ["name = %s", "is_custom_name = TRUE"]
             update_params = [name.strip()]
@@ -221,12 +250,10 @@ def update_tracked_item(item_id):
 
             cur.execute(query, tuple(update_params))
 
-            item_row = cur.fetchone()
-            if not item_row:
+            item = cur.fetchone()
+            if not item:
                 return jsonify({"error": "Item not found"}), 404
 
-            item = dict(zip([desc[0] for desc in cur.description], item_row))
-
         return jsonify(item)
     except Exception as e:
         current_app.logger.error(f"Failed to update item: {e}")
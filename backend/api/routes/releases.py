@@ -1,25 +1,68 @@
 from flask import Blueprint, jsonify, current_app
+import os
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from flask_jwt_extended import jwt_required
+from backend.api.helpers.ttl_cache import TTLCache
 
 releases_bp = Blueprint('releases_bp', __name__)
 
+RELEASES_URL = "https://api.github.com/repos/bodybuildingfly/amazon-order-trends/releases"
+
+# Shared session so calls reuse a pooled keep-alive connection to api.github.com
+# instead of a new TCP and TLS handshake each time.
+_gh_session = requests.Session()
+_gh_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+_gh_session.headers.update({
+    "Accept": "application/vnd.github+json",
+    "User-Agent": "amazon-order-trends",
+})
+# Unauthenticated requests are limited to 60 an hour per IP; a token raises that to 5,000.
+if os.environ.get('GITHUB_TOKEN'):
+    _gh_session.headers["Authorization"] = f"Bearer {os.environ['GITHUB_TOKEN']}"
+
+# Releases change rarely, so every user's page loads share one recent copy
+# instead of each calling GitHub.
+_fresh_releases = TTLCache(maxsize=1, ttl=300)
+# Last successful response from GitHub and its ETag. Once the copy above expires,
+# revalidating with If-None-Match returns 304 with no body when nothing changed,
+# and 304s don't count against the API rate limit.
+_releases_cache = {"etag": None, "releases": None}
+# Serializes upstream fetches so concurrent misses wait for one call to GitHub.
+_fetch_lock = threading.Lock()
+
+def _fetch_releases():
+    """Fetches the releases from GitHub, revalidating the last response if there is one."""
+    etag, cached_releases = _releases_cache["etag"], _releases_cache["releases"]
+    headers = {"If-None-Match": etag} if etag else {}
+
+    response = _gh_session.get(RELEASES_URL, headers=headers, timeout=10)
+    if response.status_code == 304 and cached_releases is not None:
+        return cached_releases
+    response.raise_for_status()
+    releases = response.json()
+    _releases_cache["etag"] = response.headers.get("ETag")
+    _releases_cache["releases"] = releases
+    return releases
+
 @releases_bp.route('/api/releases', methods=['GET'])
 @jwt_required()
 def get_releases():
     """
     Fetches the list of releases from the GitHub repository.
     """
-    repo_owner = "bodybuildingfly"
-    repo_name = "amazon-order-trends"
-    url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases"
+    releases = _fresh_releases.get(RELEASES_URL)
+    if releases is not None:
+        return jsonify(releases)
 
     try:
-        # GitHub API has a rate limit for unauthenticated requests, but it should be sufficient for this use case.
-        # If necessary, we can add a GITHUB_TOKEN environment variable.
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        releases = response.json()
+        with _fetch_lock:
+            # Another request may have refreshed the copy while this one waited.
+            releases = _fresh_releases.get(RELEASES_URL)
+            if releases is None:
+                releases = _fetch_releases()
+                _fresh_releases.set(RELEASES_URL, releases)
         return jsonify(releases)
     except requests.exceptions.RequestException as e:
         current_app.logger.error(f"Failed to fetch releases from GitHub: {e}")
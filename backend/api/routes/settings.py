@@ -1,9 +1,12 @@
 import requests
+from urllib.parse import urlparse
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from backend.shared.db import get_db_cursor
 from backend.api.helpers.encryption import get_fernet
 from backend.api.helpers.decorators import admin_required
+from backend.api.services.notification_service import send_price_drop_notification
+from backend.api.services.ingestion_service import invalidate_admin_notification_settings
 
 settings_bp = Blueprint('settings_bp', __name__)
 
@@ -62,7 +65,6 @@ def is_valid_discord_webhook(url):
     if not url:
         return True # Optional field
 
-    from urllib.parse import urlparse
     try:
         parsed = urlparse(url)
         if parsed.scheme != 'https':
@@ -75,6 +77,26 @@ def is_valid_discord_webhook(url):
     except Exception:
         return False
 
+# (json_key, db_column, value inserted when not submitted); the password is
+# submitted as 'amazon_password' and encrypted separately.
+_USER_SETTINGS_FIELDS = [
+    ('amazon_email', 'amazon_email', None),
+    (None, 'amazon_password_encrypted', None),
+    ('amazon_otp_secret_key', 'amazon_otp_secret_key', None),
+    ('price_change_notification_webhook_url', 'price_change_notification_webhook_url', None),
+    ('default_notification_threshold_type', 'default_notification_threshold_type', 'percent'),
+    ('default_notification_threshold_value', 'default_notification_threshold_value', None),
+    ('is_auto_sync_enabled', 'is_auto_sync_enabled', False),
+    ('auto_sync_time', 'auto_sync_time', None),
+]
+_USER_SETTINGS_COLUMNS = [column for _, column, _ in _USER_SETTINGS_FIELDS]
+_SQL_UPSERT_USER_SETTINGS = f"""
+    INSERT INTO user_settings (user_id, {', '.join(_USER_SETTINGS_COLUMNS)})
+    VALUES (%s{', %s' * len(_USER_SETTINGS_COLUMNS)})
+    ON CONFLICT (user_id) DO UPDATE SET
+    {', '.join(f"{column} = CASE WHEN %s THEN EXCLUDED.{column} ELSE user_settings.{column} END" for column in _USER_SETTINGS_COLUMNS)}
+"""
+
 @settings_bp.route('/api/settings/user', methods=['POST'])
 @jwt_required()
 def save_user_settings():
@@ -88,73 +110,36 @@ def save_user_settings():
     try:
         fernet = get_fernet()
 
-        # Map request keys to database columns
-        # Tuples of (json_key, db_column)
-        fields_map = [
-            ('amazon_email', 'amazon_email'),
-            ('amazon_otp_secret_key', 'amazon_otp_secret_key'),
-            ('price_change_notification_webhook_url', 'price_change_notification_webhook_url'),
-            ('default_notification_threshold_type', 'default_notification_threshold_type'),
-            ('default_notification_threshold_value', 'default_notification_threshold_value'),
-            ('is_auto_sync_enabled', 'is_auto_sync_enabled'),
-            ('auto_sync_time', 'auto_sync_time')
-        ]
-
-        columns = ['user_id']
-        values = [current_user_id]
-
         # Clean auto_sync_time before processing
         if 'auto_sync_time' in data and not data['auto_sync_time']:
             data['auto_sync_time'] = None
 
+        submitted = {
+            column: data[json_key]
+            for json_key, column, _ in _USER_SETTINGS_FIELDS
+            if json_key and json_key in data
+        }
+
         # Handle password specially
         if 'amazon_password' in data:
             password = data['amazon_password']
             if password:
-                encrypted_password = fernet.encrypt(password.encode('utf-8'))
-                columns.append('amazon_password_encrypted')
-                values.append(encrypted_password)
+                submitted['amazon_password_encrypted'] = fernet.encrypt(password.encode('utf-8'))
             # If password is provided as empty/null, we might ignore it or clear it?
             # Existing logic implies we update it if provided.
 
-        for json_key, db_col in fields_map:
-            if json_key in data:
-                columns.append(db_col)
-                values.append(data[json_key])
-
-        if len(columns) == 1:
+        if not submitted:
             # No fields to update
             return jsonify({"message": "No changes detected."}), 200
 
-        # Construct Dynamic SQL using psycopg2.sql
-        from psycopg2 import sql
-
-        # col_names formatting
-        sql_columns = sql.SQL(', ').join(map(sql.Identifier, columns))
-        sql_placeholders = sql.SQL(', ').join(sql.Placeholder() * len(columns))
-
-        # Exclude user_id from SET clause
-        update_assignments = []
-        for col in columns:
-            if col != 'user_id':
-                update_assignments.append(
-                    sql.SQL("{col} = EXCLUDED.{col}").format(col=sql.Identifier(col))
-                )
-        sql_update_clause = sql.SQL(', ').join(update_assignments)
-
-        query = sql.SQL("""
-            INSERT INTO user_settings ({col_names})
-            VALUES ({placeholders})
-            ON CONFLICT (user_id) DO UPDATE SET
-            {update_clause};
-        """).format(
-            col_names=sql_columns,
-            placeholders=sql_placeholders,
-            update_clause=sql_update_clause
-        )
+        # Every column is always bound, so the statement text never changes. Fields
+        # that weren't submitted get their default on insert and are left as they
+        # are on update; submitted ones, including nulls, are written.
+        values = [submitted.get(column, default) for _, column, default in _USER_SETTINGS_FIELDS]
+        provided = [column in submitted for _, column, _ in _USER_SETTINGS_FIELDS]
 
         with get_db_cursor(commit=True) as cur:
-            cur.execute(query, tuple(values))
+            cur.execute(_SQL_UPSERT_USER_SETTINGS, (current_user_id, *values, *provided))
 
         # Auto-sync scheduling is now handled globally via check_scheduled_syncs
 
@@ -177,23 +162,16 @@ def save_admin_settings():
         discord_notification_preference = data.get('discord_notification_preference', 'off')
 
         with get_db_cursor(commit=True) as cur:
+            # Creates the admin's settings row if they haven't saved user settings yet
             cur.execute("""
-                UPDATE user_settings SET
-                    discord_webhook_url = %s,
-                    discord_notification_preference = %s
-                WHERE user_id = %s;
-            """, (discord_webhook_url, discord_notification_preference, current_user_id))
-            if cur.rowcount == 0:
-                # If admin tries to save global settings but doesn't have a user_settings row yet
-                # We could insert one, but existing logic returned 404.
-                # Given we now have a dynamic insert in user settings, we could suggest using that,
-                # but admin settings are separate in UI.
-                # Let's keep existing behavior or use INSERT ON CONFLICT here too?
-                # The prompt is only about user settings defaults. Let's leave admin settings as is.
-                return jsonify({
-                    "error": "User settings not found. Please configure your main user settings before saving admin-specific settings."
-                }), 404
-        
+                INSERT INTO user_settings (user_id, discord_webhook_url, discord_notification_preference)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    discord_webhook_url = EXCLUDED.discord_webhook_url,
+                    discord_notification_preference = EXCLUDED.discord_notification_preference;
+            """, (current_user_id, discord_webhook_url, discord_notification_preference))
+        invalidate_admin_notification_settings()
+
         return jsonify({"message": "Admin settings saved successfully."}), 200
     except Exception as e:
         current_app.logger.error(f"Failed to save admin settings: {e}", exc_info=True)
@@ -211,8 +189,6 @@ def test_webhook():
     if not is_valid_discord_webhook(webhook_url):
         return jsonify({"error": "Invalid Discord webhook URL."}), 400
 
-    from backend.api.services.notification_service import send_price_drop_notification
-
     success = send_price_drop_notification(
         webhook_url,
         item_name="Test Product - Premium Widget",
@@ -3,6 +3,8 @@ from werkzeug.security import generate_password_hash
 from flask_jwt_extended import get_jwt_identity
 from backend.shared.db import get_db_cursor
 from backend.api.helpers.decorators import admin_required
+from backend.api.helpers.offload import run_cpu_bound
+from backend.api.services.ingestion_service import invalidate_admin_notification_settings
 
 users_bp = Blueprint('users_bp', __name__)
 
@@ -13,7 +15,8 @@ def get_users():
     try:
         with get_db_cursor() as cur:
             cur.execute("SELECT id, username, role, created_at FROM users ORDER BY username")
-            users = [dict(zip([desc[0] for desc in cur.description], row)) for row in cur.fetchall()]
+            columns = [desc[0] for desc in cur.description]
+            users = [dict(zip(columns, row)) for row in cur.fetchall()]
         return jsonify(users)
     except Exception as e:
         current_app.logger.error(f"Failed to fetch users: {e}", exc_info=True)
@@ -33,7 +36,7 @@ def add_user():
     if role not in ['admin', 'user']:
         return jsonify({"error": "Invalid role specified."}), 400
 
-    hashed_password = generate_password_hash(password)
+    hashed_password = run_cpu_bound(generate_password_hash, password)
     try:
         with get_db_cursor(commit=True) as cur:
             cur.execute(
@@ -64,7 +67,7 @@ def reset_password(user_id):
     if not password:
         return jsonify({"error": "Password is required."}), 400
 
-    hashed_password = generate_password_hash(password)
+    hashed_password = run_cpu_bound(generate_password_hash, password)
     try:
         with get_db_cursor(commit=True) as cur:
             cur.execute("UPDATE users SET hashed_password = %s WHERE id = %s", (hashed_password, user_id))
@@ -88,6 +91,8 @@ def delete_user(user_id):
             cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
             if cur.rowcount == 0:
                 return jsonify({"error": "User not found."}), 404
+        # The deleted user may have been the admin whose settings jobs notify with.
+        invalidate_admin_notification_settings()
         return jsonify({"message": "User deleted successfully."})
     except Exception as e:
         current_app.logger.error(f"Failed to delete user {user_id}: {e}", exc_info=True)
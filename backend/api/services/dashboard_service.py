@@ -0,0 +1,21 @@
+from backend.api.helpers.ttl_cache import TTLCache
+
+# Dashboard summaries only change when an ingestion job writes new orders, so a
+# short per-user cache absorbs repeated page loads. The cache is per worker
+# process; the TTL bounds how stale another worker's copy can get.
+SUMMARY_CACHE_TTL_SECONDS = 60
+SUMMARY_CACHE_MAX_ENTRIES = 1024
+
+_summary_cache = TTLCache(maxsize=SUMMARY_CACHE_MAX_ENTRIES, ttl=SUMMARY_CACHE_TTL_SECONDS)
+
+def get_cached_summary(user_id):
+    """Returns the cached summary payload for a user, or None if missing or expired."""
+    return _summary_cache.get(user_id)
+
+def cache_summary(user_id, payload):
+    """Stores a user's summary payload for SUMMARY_CACHE_TTL_SECONDS."""
+    _summary_cache.set(user_id, payload)
+
+def invalidate_summary(user_id):
+    """Drops a user's cached summary, e.g. after an ingestion job has written new orders."""
+    _summary_cache.pop(str(user_id))
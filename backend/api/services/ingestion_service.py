@@ -1,105 +1,349 @@
-import json
-import threading
-from datetime import datetime
-from flask import Flask, current_app
+import orjson
+import time
+import weakref
+from flask import Flask
+from psycopg2.extras import Json
 
-from backend.shared.db import get_db_cursor
-from backend.ingestion.ingestion_script import main as run_ingestion_generator
+from backend.shared.db import get_db_connection
+from backend.api.helpers.ttl_cache import TTLCache
 from backend.api.services.notification_service import send_discord_notification
+from backend.api.services.dashboard_service import invalidate_summary
+
+# Status lines and progress are written in batches rather than once per event:
+# appended lines go to the ingestion_log table, progress to the job row.
+LOG_FLUSH_LINES = 20
+LOG_FLUSH_INTERVAL_SECONDS = 1.0
+# Status reads and the Discord summary show only the most recent lines; earlier
+# ones are reported as a 'log_dropped' count.
+MAX_LOG_LINES = 500
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+MAX_NOTIFY_PAYLOAD_BYTES = 7900
+
+# Every job notifies with the first admin's Discord settings. They're cached per
+# worker process; saving admin settings invalidates this worker's copy and the
+# TTL bounds how stale another worker's can get.
+ADMIN_SETTINGS_CACHE_TTL_SECONDS = 60
+
+_prepared_connections = weakref.WeakSet()
+
+_admin_settings_cache = TTLCache(maxsize=1, ttl=ADMIN_SETTINGS_CACHE_TTL_SECONDS)
+_NOT_CACHED = object()
+
+def ingestion_job_channel(job_id):
+    """Name of the LISTEN/NOTIFY channel that a job's updates are published on."""
+    return f"ingestion_job_{job_id}"
+
+# Claims a pending job, writes its first log lines and notifies listeners in one
+# statement. A job that is no longer pending (e.g. submitted twice) returns no row.
+_SQL_START_JOB = """
+    WITH started AS (
+        UPDATE ingestion_jobs SET status = 'running', progress = %s WHERE id = %s AND status = 'pending' RETURNING id
+    ), logged AS (
+        INSERT INTO ingestion_log (job_id, line) SELECT id, unnest(%s::text[]) FROM started
+    )
+    SELECT pg_notify(%s, %s) FROM started
+"""
+# One multi-row INSERT per batch; unnest keeps the lines in order, so seq follows it.
+# It runs several times a second during a job, so it is prepared once per pooled
+# connection (prepared statements last for the session) and only EXECUTEd after that.
+_SQL_PREPARE_APPEND_LOG = """
+    PREPARE ingestion_log_append(uuid, text[]) AS
+    INSERT INTO ingestion_log (job_id, line) SELECT $1, unnest($2)
+"""
+_SQL_APPEND_LOG = "EXECUTE ingestion_log_append(%s, %s)"
+_SQL_UPDATE_PROGRESS = "UPDATE ingestion_jobs SET progress = %s WHERE id = %s"
+# Sets details->'error' in place; the rest of details is left as it is.
+_SQL_FAIL_JOB = """
+    UPDATE ingestion_jobs
+    SET status = 'failed', details = jsonb_set(COALESCE(details, '{}'), '{error}', to_jsonb(%s::text))
+    WHERE id = %s
+"""
+# Only a job that is still running is completed (a failed one keeps its status),
+# and listeners are only notified when it was.
+_SQL_COMPLETE_JOB = """
+    WITH completed AS (
+        UPDATE ingestion_jobs SET status = 'completed' WHERE id = %s AND status = 'running' RETURNING id
+    )
+    SELECT pg_notify(%s, %s) FROM completed
+"""
+_SQL_NOTIFY = "SELECT pg_notify(%s, %s)"
+# Creates a pending job unless the user already has one of the same type queued or
+# running, writing its first log line in the same round trip. Queued jobs live only
+# in a worker's executor, so a job left pending or running by a restarted worker
+# never finishes; once it has logged nothing for an hour it is failed instead of
+# blocking new jobs forever.
+_SQL_CREATE_JOB = """
+    WITH stale AS (
+        UPDATE ingestion_jobs
+        SET status = 'failed', details = jsonb_set(COALESCE(details, '{}'), '{error}', '"Job was interrupted."')
+        WHERE user_id = %s AND status IN ('pending', 'running') AND job_type = %s
+          AND updated_at < NOW() - INTERVAL '1 hour'
+          AND NOT EXISTS (
+              SELECT 1 FROM ingestion_log l
+              WHERE l.job_id = ingestion_jobs.id AND l.created_at >= NOW() - INTERVAL '1 hour'
+          )
+    ), job AS (
+        INSERT INTO ingestion_jobs (user_id, job_type, status, details)
+        SELECT %s, %s, 'pending', %s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM ingestion_jobs
+            WHERE user_id = %s AND status IN ('pending', 'running') AND job_type = %s
+              AND (
+                  updated_at >= NOW() - INTERVAL '1 hour'
+                  OR EXISTS (
+                      SELECT 1 FROM ingestion_log l
+                      WHERE l.job_id = ingestion_jobs.id AND l.created_at >= NOW() - INTERVAL '1 hour'
+                  )
+              )
+        )
+        RETURNING id
+    )
+    INSERT INTO ingestion_log (job_id, line)
+    SELECT id, %s FROM job
+    RETURNING job_id
+"""
+_SQL_ASYNC_COMMIT = "SET LOCAL synchronous_commit TO OFF"
+_SQL_LOG_TAIL = """
+    SELECT line FROM (
+        SELECT seq, line FROM ingestion_log WHERE job_id = %s ORDER BY seq DESC LIMIT %s
+    ) tail
+    ORDER BY seq
+"""
+_SQL_REFRESH_MONTHLY_SPENDING = "REFRESH MATERIALIZED VIEW CONCURRENTLY user_monthly_spending"
+_SQL_ADMIN_NOTIFICATION_SETTINGS = """
+    SELECT us.discord_webhook_url, us.discord_notification_preference
+    FROM users u
+    JOIN user_settings us ON us.user_id = u.id
+    WHERE u.role = 'admin'
+    ORDER BY u.created_at ASC
+    LIMIT 1
+"""
+
+def _progress_step(progress):
+    """A job's progress in whole percent; finer changes aren't worth a write."""
+    maximum = progress.get('max') or 0
+    value = progress.get('value') or 0
+    return (maximum, value * 100 // maximum if maximum else value)
+
+def _json(obj):
+    """Adapts job state such as progress for a JSONB parameter, encoded with orjson."""
+    return Json(obj, dumps=lambda value: orjson.dumps(value).decode('utf-8'))
+
+def _execute(conn, query, params, notify=None, durable=True):
+    """
+    Runs a single statement on the job's connection and commits it.
+
+    `notify` is an optional (job_id, event) pair; the event is published to the
+    job's channel in the same round trip and delivered when the UPDATE commits.
+    Events too large for a NOTIFY are replaced by a resync marker, which tells
+    listeners to re-read the job row.
+
+    With `durable=False` the commit doesn't wait for the WAL flush. A crash can
+    lose the last such commits, but never reorders them: the next durable commit
+    on the job (failing or completing it) flushes them too.
+    """
+    if not durable:
+        query = f"{_SQL_ASYNC_COMMIT}; {query}"
+    with conn.cursor() as cur:
+        if notify is None:
+            cur.execute(query, params)
+        else:
+            job_id, event = notify
+            payload = orjson.dumps(event)
+            if len(payload) > MAX_NOTIFY_PAYLOAD_BYTES:
+                payload = orjson.dumps({"resync": True})
+            cur.execute(f"{query}; {_SQL_NOTIFY}", (*params, ingestion_job_channel(job_id), payload.decode('utf-8')))
+    conn.commit()
+
+def _get_admin_notification_settings(conn):
+    """Returns the admin's (webhook_url, preference), or None if they have no settings row."""
+    settings = _admin_settings_cache.get('admin', _NOT_CACHED)
+    if settings is _NOT_CACHED:
+        with conn.cursor() as cur:
+            cur.execute(_SQL_ADMIN_NOTIFICATION_SETTINGS)
+            settings = cur.fetchone()
+        conn.rollback()
+        _admin_settings_cache.set('admin', settings)
+    return settings
+
+def invalidate_admin_notification_settings():
+    """Drops the cached admin notification settings, e.g. after the admin saves new ones."""
+    _admin_settings_cache.clear()
+
+def create_job(cur, user_id, job_type, first_line):
+    """
+    Creates a pending job of `job_type` for the user on the given cursor and
+    returns its id, or None if the user already has one queued or running.
+    """
+    cur.execute(
+        _SQL_CREATE_JOB,
+        (user_id, job_type, user_id, job_type, Json({'error': None}), user_id, job_type, first_line)
+    )
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def submit_ingestion_job(app: Flask, **kwargs):
+    """
+    Queues run_manual_ingestion_job on the app's bounded ingestion executor.
+    Errors the job doesn't handle itself, e.g. no free database connection,
+    are logged instead of vanishing with the future.
+    """
+    def log_failure(future):
+        if future.exception() is not None:
+            app.logger.error(f"Ingestion job {kwargs.get('job_id')} crashed: {future.exception()}", exc_info=future.exception())
+
+    future = app.ingest_executor.submit(run_manual_ingestion_job, app=app, **kwargs)
+    future.add_done_callback(log_failure)
+    return future
 
 def run_manual_ingestion_job(app: Flask, user_id: str, job_id: int, days: int, debug: bool = False, job_type: str = 'manual'):
     """
     Runs the ingestion process in a background thread for a single user
     and updates the job status in the database.
+
+    A single pooled connection is held for the lifetime of the job, so the
+    many small status/progress updates don't each pay for a pool checkout.
     """
-    with app.app_context():
-        # Initialize job details in the database
-        log = ["Job started..."]
+    # Imported here so the amazon-orders client and its dependencies only load
+    # once a job actually runs, not when the API starts.
+    from backend.ingestion.ingestion_script import main as run_ingestion_generator
+
+    with app.app_context(), get_db_connection() as conn:
+        # Log lines live only in ingestion_log; the job only buffers the ones not yet written.
+        pending_lines = []
+        # Counts the line written when the job was created.
+        logged_lines = 1
         progress = {"value": 0, "max": 100}
-        details = {"log": log, "error": None}
-        
-        try:
-            with get_db_cursor(commit=True) as cur:
-                cur.execute(
-                    "UPDATE ingestion_jobs SET status = 'running', progress = %s, details = %s WHERE id = %s",
-                    (json.dumps(progress), json.dumps(details), job_id)
+        job_error = None
+
+        progress_changed = False
+        last_flush = time.monotonic()
+
+        def append_log(line):
+            nonlocal logged_lines
+            pending_lines.append(line)
+            logged_lines += 1
+
+        def log_dropped():
+            return max(logged_lines - MAX_LOG_LINES, 0)
+
+        def take_pending_lines():
+            # Lines appended since the last write; they go out with the next statement.
+            nonlocal pending_lines, last_flush
+            lines = pending_lines
+            pending_lines = []
+            last_flush = time.monotonic()
+            return lines
+
+        def flush_log():
+            # Progress that changed since the last write goes out in the same round trip.
+            # These in-flight writes commit asynchronously; only the job's start and final
+            # status wait for the disk.
+            nonlocal progress_changed
+            lines = take_pending_lines()
+            event = {"lines": lines, "log_dropped": log_dropped()}
+            if progress_changed:
+                event["progress"] = progress
+                _execute(
+                    conn, f"{_SQL_APPEND_LOG}; {_SQL_UPDATE_PROGRESS}", (job_id, lines, _json(progress), job_id),
+                    notify=(job_id, event), durable=False
                 )
+                progress_changed = False
+            else:
+                _execute(conn, _SQL_APPEND_LOG, (job_id, lines), notify=(job_id, event), durable=False)
+
+        def fail_job(error):
+            # Unwritten lines and the failure are committed together.
+            nonlocal job_error
+            job_error = error
+            lines = take_pending_lines()
+            _execute(
+                conn, f"{_SQL_APPEND_LOG}; {_SQL_FAIL_JOB}", (job_id, lines, error, job_id),
+                notify=(job_id, {"lines": lines, "log_dropped": log_dropped(), "status": "failed", "error": error})
+            )
+
+        append_log("Job started...")
+        lines = take_pending_lines()
+        event = {"status": "running", "progress": progress, "lines": lines, "log_dropped": log_dropped()}
+        with conn.cursor() as cur:
+            if conn not in _prepared_connections:
+                cur.execute(_SQL_PREPARE_APPEND_LOG)
+                _prepared_connections.add(conn)
+            cur.execute(
+                _SQL_START_JOB,
+                (_json(progress), job_id, lines, ingestion_job_channel(job_id), orjson.dumps(event).decode('utf-8'))
+            )
+            started = cur.fetchone() is not None
+        conn.commit()
+        if not started:
+            app.logger.warning(f"Skipping {job_type} ingestion job {job_id}: it is no longer pending.")
+            # Listeners re-read the job, so they see the status whatever claimed or failed it left
+            _execute(conn, _SQL_NOTIFY, (ingestion_job_channel(job_id), '{"resync": true}'))
+            return
+
+        try:
 
             app.logger.info(f"Starting {job_type} ingestion for user {user_id} (Job ID: {job_id}) for {days} days.")
-            
+
+            def log_flush_due():
+                return (pending_lines or progress_changed) and (
+                    len(pending_lines) >= LOG_FLUSH_LINES
+                    or time.monotonic() - last_flush >= LOG_FLUSH_INTERVAL_SECONDS
+                )
+
             # The core ingestion logic
             for event_type, data in run_ingestion_generator(user_id=user_id, manual_days_override=days, debug=debug):
                 if event_type == 'status':
-                    log.append(data)
-                    details['log'] = log
-                    with get_db_cursor(commit=True) as cur:
-                        cur.execute("UPDATE ingestion_jobs SET details = %s WHERE id = %s", (json.dumps(details), job_id))
+                    append_log(data)
+                    if log_flush_due():
+                        flush_log()
                 
                 elif event_type == 'progress':
+                    if _progress_step(data) != _progress_step(progress):
+                        progress_changed = True
                     progress = data
-                    with get_db_cursor(commit=True) as cur:
-                        cur.execute("UPDATE ingestion_jobs SET progress = %s WHERE id = %s", (json.dumps(progress), job_id))
+                    if log_flush_due():
+                        flush_log()
 
                 elif event_type == 'error':
-                    log.append(f"ERROR: {data}")
-                    details['log'] = log
-                    details['error'] = data
-                    with get_db_cursor(commit=True) as cur:
-                        cur.execute(
-                            "UPDATE ingestion_jobs SET status = 'failed', details = %s WHERE id = %s",
-                            (json.dumps(details), job_id)
-                        )
+                    append_log(f"ERROR: {data}")
+                    fail_job(data)
 
                 elif event_type == 'done':
-                    log.append(data)
-                    details['log'] = log
-                    with get_db_cursor(commit=True) as cur:
-                        cur.execute("UPDATE ingestion_jobs SET details = %s WHERE id = %s", (json.dumps(details), job_id))
+                    append_log(data)
+                    flush_log()
+
+            if pending_lines or progress_changed:
+                flush_log()
 
             # Finalize job status
-            with get_db_cursor(commit=True) as cur:
-                # Check current status to avoid overwriting a 'failed' status
-                cur.execute("SELECT status FROM ingestion_jobs WHERE id = %s", (job_id,))
-                current_status = cur.fetchone()[0]
-                if current_status == 'running':
-                    cur.execute("UPDATE ingestion_jobs SET status = 'completed' WHERE id = %s", (job_id,))
+            _execute(conn, _SQL_COMPLETE_JOB, (job_id, ingestion_job_channel(job_id), '{"status": "completed"}'))
 
         except Exception as e:
             app.logger.error(f"{job_type.capitalize()} ingestion job {job_id} failed for user {user_id}: {e}", exc_info=True)
-            details['error'] = str(e)
-            with get_db_cursor(commit=True) as cur:
-                cur.execute(
-                    "UPDATE ingestion_jobs SET status = 'failed', details = %s WHERE id = %s",
-                    (json.dumps(details), job_id)
-                )
+            conn.rollback()
+            fail_job(str(e))
         finally:
-            with get_db_cursor(commit=True) as cur:
-                cur.execute("UPDATE ingestion_jobs SET updated_at = %s WHERE id = %s", (datetime.utcnow(), job_id))
+            # Make sure the connection isn't left in an aborted transaction
+            conn.rollback()
+            try:
+                # Roll any new orders into the dashboard's monthly aggregates.
+                _execute(conn, _SQL_REFRESH_MONTHLY_SPENDING, ())
+            except Exception as e:
+                conn.rollback()
+                app.logger.error(f"Failed to refresh monthly spending after job {job_id}: {e}", exc_info=True)
+            # New orders (and the job's updated_at) change the user's dashboard summary.
+            invalidate_summary(user_id)
             
-            app.logger.info(f"{job_type.capitalize()} ingestion job {job_id} finished for user {user_id}. Checking for notifications...")
+            app.logger.info(f"{job_type.capitalize()} ingestion job {job_id} finished for user {user_id}.")
             try:
-                with get_db_cursor() as cur:
-                    # For manual jobs, we now use the admin's settings globally.
-                    # First, get the admin user's ID by their role.
-                    cur.execute("SELECT id FROM users WHERE role = 'admin' ORDER BY created_at ASC LIMIT 1")
-                    admin_user_result = cur.fetchone()
-                    
-                    if not admin_user_result:
-                        app.logger.error("Could not find an admin user to use for global notifications.")
-                        settings = None
-                    else:
-                        admin_user_id = admin_user_result[0]
-                        app.logger.info(f"Found admin user with ID {admin_user_id} for global notification settings.")
-                        cur.execute(
-                            "SELECT discord_webhook_url, discord_notification_preference FROM user_settings WHERE user_id = %s",
-                            (admin_user_id,)
-                        )
-                        settings = cur.fetchone()
-                
+                # For manual jobs, we use the (first) admin's settings globally.
+                settings = _get_admin_notification_settings(conn)
+
                 if settings:
                     webhook_url, pref = settings
-                    job_has_error = bool(details.get('error'))
-                    app.logger.info(f"[Notification Check] User: {user_id}, Job: {job_id}, Webhook Present: {bool(webhook_url)}, Preference: '{pref}', Job Has Error: {job_has_error}")
+                    job_has_error = bool(job_error)
 
                     should_send = False
                     if webhook_url:
@@ -107,11 +351,13 @@ def run_manual_ingestion_job(app: Flask, user_id: str, job_id: int, days: int, d
                             should_send = True
                         elif pref == 'errors_only' and job_has_error:
                             should_send = True
-                    
-                    app.logger.info(f"[Notification Check] Final decision for job {job_id}: should_send = {should_send}")
+
+                    app.logger.debug(
+                        "discord_notify",
+                        extra={'job_id': job_id, 'has_webhook': bool(webhook_url), 'errors': job_has_error, 'should_send': should_send}
+                    )
 
                     if should_send:
-                        app.logger.info(f"Preparing to send notification for {job_type} job {job_id}...")
                         if job_has_error:
                             title = f"{job_type.capitalize()} Ingestion Job Failed (ID: {job_id})"
                             description = f"Your {job_type}ly triggered ingestion job has failed."
@@ -121,8 +367,13 @@ def run_manual_ingestion_job(app: Flask, user_id: str, job_id: int, days: int, d
                             description = f"Your {job_type}ly triggered ingestion job has finished successfully."
                             color = 3066993  # Green
                         
-                        send_discord_notification(webhook_url, title, description, color, details.get('log', []))
+                        with conn.cursor() as cur:
+                            cur.execute(_SQL_LOG_TAIL, (job_id, MAX_LOG_LINES))
+                            log = [row[0] for row in cur.fetchall()]
+                        conn.rollback()
+
+                        send_discord_notification(webhook_url, title, description, color, log)
                 else:
-                    app.logger.info(f"No notification settings found for user {user_id}.")
+                    app.logger.debug(f"No admin notification settings found for job {job_id}.")
             except Exception as e:
                 app.logger.error(f"Failed to send notification for manual job {job_id}: {e}", exc_info=True)
@@ -1,33 +1,102 @@
+import atexit
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
-def send_discord_notification(webhook_url, title, description, color, log_messages):
-    """Sends a formatted notification to a Discord webhook."""
-    if not webhook_url:
-        return
+NOTIFICATION_WORKERS = 4
+
+# Shared session so webhook posts reuse pooled keep-alive connections to Discord.
+# Rate limits (429) and transient 5xx responses are retried with backoff. The pool
+# keeps a connection per background worker, plus one for webhook tests, which
+# post directly.
+_session = requests.Session()
+_session.headers["User-Agent"] = "amazon-order-trends"
+_session.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=NOTIFICATION_WORKERS + 1,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(['POST']),
+        raise_on_status=False
+    )
+))
+
+# Job summaries and price drop alerts are posted in the background so a slow
+# webhook (up to the 10s timeout, plus retries) doesn't hold up the ingestion
+# or price update job that sent them.
+_notification_executor = ThreadPoolExecutor(max_workers=NOTIFICATION_WORKERS, thread_name_prefix='discord-notify')
+# Deliver anything still queued before the process exits.
+atexit.register(_notification_executor.shutdown)
 
-    # Truncate log messages to fit within Discord's description limits (4096 chars)
-    log_content = "\n".join(log_messages)
-    if len(log_content) > 3800:
-        log_content = log_content[:3800] + "\n... (log truncated)"
+# Characters of log included in a job summary.
+LOG_CHAR_BUDGET = 3800
+
+def _utc_timestamp():
+    """The current UTC time as 'YYYY-MM-DD HH:MM:SS UTC', for embed footers."""
+    now = datetime.utcnow()
+    return f"{now.year}-{now.month:02d}-{now.day:02d} {now.hour:02d}:{now.minute:02d}:{now.second:02d} UTC"
+
+def build_discord_embed(title, description, color, log_messages):
+    """
+    Builds a job summary embed with the end of its log. The embed can be sent
+    to any number of webhooks with send_discord_notification_prebuilt.
+    """
+    # Keep the end of the log, which holds the outcome, within Discord's description
+    # limit (4096 chars). Lines are taken from the end until the budget runs out, so
+    # a long log is never joined in full.
+    tail = []
+    remaining = LOG_CHAR_BUDGET
+    for line in reversed(log_messages):
+        if len(line) + 1 > remaining:
+            if remaining > 1:
+                tail.append(line[-(remaining - 1):])
+            tail.append("... (log truncated)")
+            break
+        tail.append(line)
+        remaining -= len(line) + 1
+    log_content = "\n".join(reversed(tail))
     
     full_description = description + f"\n\n**Verbose Log:**\n```\n{log_content}\n```"
     
-    embed = {
+    return {
         "title": title,
         "description": full_description,
         "color": color,
         "footer": {
-            "text": f"Report generated at {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}"
+            "text": f"Report generated at {_utc_timestamp()}"
         }
     }
 
+def send_discord_notification(webhook_url, title, description, color, log_messages):
+    """Queues a formatted notification to a Discord webhook and returns immediately."""
+    if not webhook_url:
+        return
+    send_discord_notification_prebuilt(webhook_url, build_discord_embed(title, description, color, log_messages))
+
+def send_discord_notification_prebuilt(webhook_url, embed):
+    """Queues an embed from build_discord_embed for a Discord webhook and returns immediately."""
+    if not webhook_url:
+        return
+    future = _notification_executor.submit(_post_discord_embed, webhook_url, embed)
+    future.add_done_callback(_log_send_failure)
+
+def _log_send_failure(future):
+    # Request errors are logged by the sender; this catches anything else instead of losing it with the future.
+    if future.exception() is not None:
+        logger.error(f"Discord notification crashed: {future.exception()}", exc_info=future.exception())
+
+def _post_discord_embed(webhook_url, embed):
+    """Sends a formatted notification to a Discord webhook."""
     try:
         logger.info(f"Sending Discord notification to {webhook_url[:30]}...")
-        response = requests.post(webhook_url, json={"embeds": [embed]}, timeout=10)
+        response = _session.post(webhook_url, json={"embeds": [embed]}, timeout=10)
         response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
         logger.info(f"Successfully sent Discord notification.")
     except requests.exceptions.RequestException as e:
@@ -38,20 +107,21 @@ def send_discord_notification(webhook_url, title, description, color, log_messag
             error_message += f"\nResponse Body: {e.response.text}"
         logger.error(error_message)
 
-def send_price_drop_notification(webhook_url, item_name, current_price, previous_price, url, currency="$"):
-    """
-    Sends a price drop notification to a Discord webhook.
-    """
-    if not webhook_url:
-        return
+# Discord accepts up to 10 embeds in one webhook message.
+MAX_EMBEDS_PER_MESSAGE = 10
 
+_PRICE_DROP_EMBED = {
+    "title": "Price Drop Alert!",
+    "color": 5763719,  # Green
+}
+
+def _price_drop_embed(item_name, current_price, previous_price, url, currency="$", checked_at=None):
     price_change = current_price - previous_price
     price_change_percent = (price_change / previous_price) * 100 if previous_price else 0
 
-    embed = {
-        "title": "Price Drop Alert!",
+    return {
+        **_PRICE_DROP_EMBED,
         "description": f"The price of [{item_name}]({url}) has dropped!",
-        "color": 5763719,  # Green
         "fields": [
             {
                 "name": "Previous Price",
@@ -71,13 +141,14 @@ def send_price_drop_notification(webhook_url, item_name, current_price, previous
         ],
         "url": url,
         "footer": {
-            "text": f"Price Check at {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}"
+            "text": f"Price Check at {checked_at or _utc_timestamp()}"
         }
     }
 
+def _post_price_drop_embeds(webhook_url, embeds):
     try:
         logger.info(f"Sending Price Drop Notification to {webhook_url[:30]}...")
-        response = requests.post(webhook_url, json={"embeds": [embed]}, timeout=10)
+        response = _session.post(webhook_url, json={"embeds": embeds}, timeout=10)
         response.raise_for_status()
         logger.info(f"Successfully sent Price Drop Notification.")
         return True
@@ -88,3 +159,45 @@ def send_price_drop_notification(webhook_url, item_name, current_price, previous
             error_message += f"\nResponse Body: {e.response.text}"
         logger.error(error_message)
         return False
+
+def send_price_drop_notification(webhook_url, item_name, current_price, previous_price, url, currency="$"):
+    """
+    Sends a price drop notification to a Discord webhook.
+    """
+    if not webhook_url:
+        return
+
+    return _post_price_drop_embeds(
+        webhook_url, [_price_drop_embed(item_name, current_price, previous_price, url, currency)]
+    )
+
+def send_price_drop_notifications_bulk(webhook_url, drops):
+    """
+    Sends several price drops to a Discord webhook, up to MAX_EMBEDS_PER_MESSAGE
+    per message. Each drop is a dict of send_price_drop_notification's keyword
+    arguments; repeats of the same item at the same price are sent once.
+    Returns True if every message was delivered.
+    """
+    if not webhook_url:
+        return
+
+    checked_at = _utc_timestamp()
+    embeds = []
+    seen = set()
+    for drop in drops:
+        key = (drop['url'], drop['current_price'])
+        if key not in seen:
+            seen.add(key)
+            embeds.append(_price_drop_embed(checked_at=checked_at, **drop))
+
+    sent = True
+    for start in range(0, len(embeds), MAX_EMBEDS_PER_MESSAGE):
+        sent = _post_price_drop_embeds(webhook_url, embeds[start:start + MAX_EMBEDS_PER_MESSAGE]) and sent
+    return sent
+
+def queue_price_drop_notifications(webhook_url, drops):
+    """Queues send_price_drop_notifications_bulk for a Discord webhook and returns immediately."""
+    if not webhook_url:
+        return
+    future = _notification_executor.submit(send_price_drop_notifications_bulk, webhook_url, drops)
+    future.add_done_callback(_log_send_failure)
@@ -1,32 +1,103 @@
 import logging
+import random
+import threading
+import time
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
 from fake_useragent import UserAgent
 from datetime import datetime
 from backend.shared.db import get_db_cursor
-from backend.api.services.notification_service import send_price_drop_notification
+from backend.api.helpers.ttl_cache import TTLCache
+from backend.api.services.notification_service import queue_price_drop_notifications
 import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
+_ASIN_RE = re.compile(r"(?:/dp/|/gp/product/)([A-Z0-9]{10})")
+
 def extract_asin(url):
     """
     Extracts the ASIN from an Amazon URL.
     Returns the ASIN string or None.
     """
-    match = re.search(r"(?:/dp/|/gp/product/)([A-Z0-9]{10})", url)
+    match = _ASIN_RE.search(url)
     if match:
         return match.group(1)
     return None
 
-def get_amazon_price(url):
+# The scheduled update fetches this many product pages at a time. The work is
+# I/O-bound, but Amazon starts serving CAPTCHAs to clients that fetch too many at once.
+PRICE_FETCH_WORKERS = 4
+
+# Requests to one host are limited to FETCH_PER_HOST at a time across all fetch
+# workers, each after a short random pause. While a host serves CAPTCHAs, its
+# pause doubles per blocked page (up to MAX_FETCH_BACKOFF times) and halves
+# again per page that gets through.
+FETCH_PER_HOST = 2
+FETCH_DELAY_SECONDS = (0.5, 1.5)
+MAX_FETCH_BACKOFF = 8
+
+_host_slots = {}
+_host_backoff = {}
+_host_lock = threading.Lock()
+
+# Shared session so successive product pages reuse keep-alive connections (and
+# their TLS sessions) to Amazon instead of a fresh handshake per item. The pool
+# holds a connection per fetch worker. Rate limits (429) and transient 5xx
+# responses are retried with backoff, honoring Retry-After, so the item isn't
+# skipped until the next scheduled run. Tracked http:// links get the same
+# pooling and retries.
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=PRICE_FETCH_WORKERS,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+)
+_session = requests.Session()
+_session.mount('https://', _adapter)
+_session.mount('http://', _adapter)
+
+@contextmanager
+def _host_slot(host):
+    with _host_lock:
+        slots = _host_slots.setdefault(host, threading.BoundedSemaphore(FETCH_PER_HOST))
+    with slots:
+        time.sleep(random.uniform(*FETCH_DELAY_SECONDS) * _host_backoff.get(host, 1))
+        yield
+
+def _record_host_result(host, blocked):
+    with _host_lock:
+        backoff = _host_backoff.get(host, 1)
+        _host_backoff[host] = min(backoff * 2, MAX_FETCH_BACKOFF) if blocked else max(backoff // 2, 1)
+
+# Loading fake-useragent's browser data is slow, so one instance is shared by
+# every fetch. Created on first use rather than at import.
+_user_agent = None
+
+def _get_user_agent():
+    global _user_agent
+    if _user_agent is None:
+        _user_agent = UserAgent()
+    return _user_agent
+
+def get_amazon_price(url, session=None):
     """
     Scrapes the price of an Amazon product from the given URL.
     Returns a tuple (price, name, currency).
     """
-    ua = UserAgent()
     headers = {
-        'User-Agent': ua.random,
+        'User-Agent': _get_user_agent().random,
         'Accept-Language': 'en-US,en;q=0.9',
         'Accept-Encoding': 'gzip, deflate, br',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
@@ -34,150 +105,338 @@ def get_amazon_price(url):
         'Upgrade-Insecure-Requests': '1',
     }
 
+    host = urlparse(url).netloc
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'lxml')
-
-        # Check for CAPTCHA or blocking
-        page_title_text = soup.title.string.strip() if soup.title else ""
-        if "CAPTCHA" in page_title_text or "Robot Check" in page_title_text:
+        with _host_slot(host):
+            response = (session or _session).get(url, headers=headers, timeout=10, stream=True)
+            try:
+                response.raise_for_status()
+                tree = _read_product_page(response, url)
+            finally:
+                # Drops the connection if the rest of the page was skipped
+                response.close()
+        if tree is None:
             logger.warning(f"CAPTCHA detected for URL: {url}")
+            _record_host_result(host, blocked=True)
             return None, None, None
+        # Queried on the thread that built the tree; lxml trees aren't safe to
+        # hand across native threads
+        price, title, currency = parse_amazon_html(tree, url, response.url)
+        # Only a CAPTCHA page comes back without even a fallback title
+        _record_host_result(host, blocked=title is None)
+        return price, title, currency
+
+    except requests.RequestException as e:
+        logger.error(f"Error fetching URL {url}: {e}")
+        return None, None, None
+    except Exception as e:
+        logger.error(f"Error parsing page {url}: {e}")
+        return None, None, None
+
+# Product pages are parsed as they download, FETCH_CHUNK_BYTES at a time, and
+# the rest of the page is skipped once the title and main price block are in.
+# Pages are never read past MAX_PAGE_BYTES.
+FETCH_CHUNK_BYTES = 64 * 1024
+MAX_PAGE_BYTES = 2 * 1024 * 1024
 
-        # 1. Extract Title
-        title = None
-
-        # Priority 1: Main product title element
-        title_element = soup.select_one('#productTitle')
-        if title_element:
-            title = title_element.get_text(strip=True)
-
-        # Priority 2: Meta title
-        if not title:
-            meta_title = soup.select_one('meta[name="title"]')
-            if meta_title:
-                title = meta_title.get('content')
-
-        # Priority 3: OG Title
-        if not title:
-            og_title = soup.select_one('meta[property="og:title"]')
-            if og_title:
-                title = og_title.get('content')
-
-        # Priority 4: H1 (sometimes used on mobile or different layouts)
-        if not title:
-            h1_title = soup.select_one('h1')
-            if h1_title:
-                title = h1_title.get_text(strip=True)
-
-        # Priority 5: Fallback to page title, cleaning up "Amazon.com: " prefix/suffix
-        if not title:
-            if page_title_text:
-                # Remove "Amazon.com: " or " : Amazon.com"
-                clean_title = page_title_text.replace("Amazon.com: ", "").replace(" : Amazon.com", "").strip()
-                if clean_title:
-                    title = clean_title
-
-        if not title:
-            title = "Unknown Product"
-            logger.warning(f"Could not extract title for URL: {url}. Page Title was: {page_title_text}")
-
-        # 2. Extract Price
-
-        # Extract ASIN from URL
-        url_asin = extract_asin(url)
-
-        # If ASIN not found in initial URL, try to extract from the final URL (handling short links/redirects)
+# A CAPTCHA interstitial is recognized by the <title> within its first bytes,
+# before any parsing.
+CAPTCHA_SCAN_BYTES = 4096
+_PAGE_TITLE_RE = re.compile(rb'<title[^>]*>([^<]*)', re.IGNORECASE)
+
+def _is_captcha_page(head):
+    match = _PAGE_TITLE_RE.search(head, 0, CAPTCHA_SCAN_BYTES)
+    return match is not None and (b"CAPTCHA" in match.group(1) or b"Robot Check" in match.group(1))
+
+def _read_product_page(response, url):
+    """
+    Reads a streamed product page into an lxml tree, stopping early once the
+    product title and the #corePrice_feature_div price block have been parsed,
+    provided that block is the one parse_amazon_html would use anyway.
+    Returns None, without parsing, for a CAPTCHA page.
+    """
+    # Decode with the charset the response declares, or UTF-8 (what Amazon
+    # serves), rather than leaving libxml2 to guess, which falls back to Latin-1.
+    content_type = response.headers.get('Content-Type', '')
+    encoding = response.encoding if 'charset' in content_type.lower() else 'utf-8'
+    parser = etree.HTMLPullParser(events=('end',), encoding=encoding)
+    url_asin = extract_asin(url) or extract_asin(response.url)
+    has_title = has_price = False
+    read = 0
+    for chunk in response.iter_content(FETCH_CHUNK_BYTES):
+        if not read and _is_captcha_page(chunk):
+            return None
+        # Fed on the calling thread: an lxml parser must stay on the thread
+        # that first fed it, so its chunks can't be spread over a thread pool
+        parser.feed(chunk)
+        read += len(chunk)
+        for _, element in parser.read_events():
+            element_id = element.get('id')
+            if element_id == 'productTitle':
+                has_title = bool(_text(element))
+            elif element_id == 'corePrice_feature_div':
+                # With a URL ASIN, an earlier container for that ASIN wins, so
+                # this block is only final when it is that container itself.
+                has_price = _first(_XP_OFFSCREEN_PRICE, element) is not None and (
+                    not url_asin or (element.tag == 'div' and element.get('data-csa-c-asin') == url_asin)
+                )
+        if (has_title and has_price) or read >= MAX_PAGE_BYTES:
+            break
+    return parser.close()
+
+# Successful scrapes are reused for this long, so a product tracked by several
+# users (or re-checked by an overlapping run) is only downloaded once.
+PRICE_CACHE_TTL_SECONDS = 900
+_price_cache = TTLCache(maxsize=1024, ttl=PRICE_CACHE_TTL_SECONDS)
+
+def _get_amazon_price_cached(url):
+    result = _price_cache.get(url)
+    if result is None:
+        result = get_amazon_price(url)
+        if result[0] is not None:
+            _price_cache.set(url, result)
+    return result
+
+# Page lookups for parse_amazon_html, compiled once rather than per page
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+_XP_PAGE_TITLE = etree.XPath('//title')
+_XP_PRODUCT_TITLE = etree.XPath('//*[@id="productTitle"]')
+_XP_META_TITLE = etree.XPath('//meta[@name="title"]')
+_XP_OG_TITLE = etree.XPath('//meta[@property="og:title"]')
+_XP_H1 = etree.XPath('//h1')
+_XP_ASIN_CONTAINER = etree.XPath('//div[@data-csa-c-asin=$asin]')
+# Priority containers, with the CSS selector each stands for (for log messages)
+_XP_MAIN_CONTAINERS = [
+    (f'#{element_id}', etree.XPath(f'//*[@id="{element_id}"]'))
+    for element_id in ('corePrice_feature_div', 'corePriceDisplay_desktop_feature_div', 'apex_desktop')
+]
+_XP_OFFSCREEN_PRICE = etree.XPath(f'.//*[{_has_class("a-price")}]//*[{_has_class("a-offscreen")}]')
+_XP_PRICEBLOCK_OURPRICE = etree.XPath('//*[@id="priceblock_ourprice"]')
+_XP_PRICEBLOCK_DEALPRICE = etree.XPath('//*[@id="priceblock_dealprice"]')
+_XP_PRICE_WHOLE = etree.XPath(f'//*[{_has_class("a-price-whole")}]')
+_XP_PRICE_FRACTION = etree.XPath(f'//*[{_has_class("a-price-fraction")}]')
+_PRICE_CLEAN_RE = re.compile(r'[^\d.]')
+_NON_DIGIT_RE = re.compile(r'\D')
+
+def _first(xpath, node, **variables):
+    """Returns the first element `xpath` matches under `node`, in document order, or None."""
+    matches = xpath(node, **variables)
+    return matches[0] if matches else None
+
+def _text(element):
+    """The element's text with each piece stripped and joined, like BeautifulSoup's get_text(strip=True)."""
+    return "".join(piece.strip() for piece in element.itertext())
+
+def parse_amazon_html(tree, url, final_url=None):
+    """
+    Extracts (price, name, currency) from the parsed tree of a fetched Amazon
+    product page. `final_url` is where the request ended up after redirects;
+    its ASIN is used when `url` (e.g. a short link) has none. Returns
+    (None, None, None) for CAPTCHA pages.
+    """
+    # Check for CAPTCHA or blocking
+    page_title = _first(_XP_PAGE_TITLE, tree)
+    page_title_text = (page_title.text or "").strip() if page_title is not None else ""
+    if "CAPTCHA" in page_title_text or "Robot Check" in page_title_text:
+        logger.warning(f"CAPTCHA detected for URL: {url}")
+        return None, None, None
+
+    # 1. Extract Title
+    title = None
+
+    # Priority 1: Main product title element
+    title_element = _first(_XP_PRODUCT_TITLE, tree)
+    if title_element is not None:
+        title = _text(title_element)
+
+    # Priority 2: Meta title
+    if not title:
+        meta_title = _first(_XP_META_TITLE, tree)
+        if meta_title is not None:
+            title = meta_title.get('content')
+
+    # Priority 3: OG Title
+    if not title:
+        og_title = _first(_XP_OG_TITLE, tree)
+        if og_title is not None:
+            title = og_title.get('content')
+
+    # Priority 4: H1 (sometimes used on mobile or different layouts)
+    if not title:
+        h1_title = _first(_XP_H1, tree)
+        if h1_title is not None:
+            title = _text(h1_title)
+
+    # Priority 5: Fallback to page title, cleaning up "Amazon.com: " prefix/suffix
+    if not title:
+        if page_title_text:
+            # Remove "Amazon.com: " or " : Amazon.com"
+            clean_title = page_title_text.replace("Amazon.com: ", "").replace(" : Amazon.com", "").strip()
+            if clean_title:
+                title = clean_title
+
+    if not title:
+        title = "Unknown Product"
+        logger.warning(f"Could not extract title for URL: {url}. Page Title was: {page_title_text}")
+
+    # 2. Extract Price
+
+    # Extract ASIN from URL
+    url_asin = extract_asin(url)
+
+    # If ASIN not found in initial URL, try to extract from the final URL (handling short links/redirects)
+    if not url_asin and final_url:
+        url_asin = extract_asin(final_url)
+
+    price = None
+    price_element = None
+
+    # Priority 1: Check corePrice and other specific containers with ASIN verification
+
+    # If we have a URL ASIN, try to find a container specifically for it first
+    if url_asin:
+        container = _first(_XP_ASIN_CONTAINER, tree, asin=url_asin)
+        if container is not None:
+            price_element = _first(_XP_OFFSCREEN_PRICE, container)
+
+    # If no specific container found, check the main containers
+    if price_element is None:
+        for selector, xpath in _XP_MAIN_CONTAINERS:
+            container = _first(xpath, tree)
+            if container is not None:
+                # If we have a URL ASIN, verify against the container's ASIN if present
+                page_asin = container.get('data-csa-c-asin')
+                if url_asin and page_asin and url_asin != page_asin:
+                    logger.warning(f"ASIN mismatch in {selector}: URL={url_asin}, Page={page_asin}. Skipping.")
+                    continue
+
+                price_element = _first(_XP_OFFSCREEN_PRICE, container)
+                if price_element is not None:
+                    break
+
+    # Priority 2: Fallback to legacy selectors or generic (only if strict search failed)
+    # If url_asin is present, we DO NOT fallback to generic selectors to prevent scraping wrong variation prices.
+    if price_element is None and not url_asin:
+        price_element = _first(_XP_OFFSCREEN_PRICE, tree)
+
+        if price_element is None:
+            price_element = _first(_XP_PRICEBLOCK_OURPRICE, tree)
+        if price_element is None:
+            price_element = _first(_XP_PRICEBLOCK_DEALPRICE, tree)
+
+    if price_element is None:
+        # Only check price_whole if we don't have a verified ASIN (or if strict check passed but failed to get element which shouldn't happen if we broke loop)
+        # Actually, if url_asin is present, we shouldn't use .a-price-whole either as it's very generic.
         if not url_asin:
-            url_asin = extract_asin(response.url)
-
-        price_element = None
-
-        # Priority 1: Check corePrice and other specific containers with ASIN verification
-        # Define priority containers
-        main_containers = ['#corePrice_feature_div', '#corePriceDisplay_desktop_feature_div', '#apex_desktop']
-
-        # If we have a URL ASIN, try to find a container specifically for it first
-        if url_asin:
-            container = soup.find('div', attrs={'data-csa-c-asin': url_asin})
-            if container:
-                price_element = container.select_one('.a-price .a-offscreen')
-
-        # If no specific container found, check the main containers
-        if not price_element:
-            for selector in main_containers:
-                container = soup.select_one(selector)
-                if container:
-                    # If we have a URL ASIN, verify against the container's ASIN if present
-                    page_asin = container.get('data-csa-c-asin')
-                    if url_asin and page_asin and url_asin != page_asin:
-                        logger.warning(f"ASIN mismatch in {selector}: URL={url_asin}, Page={page_asin}. Skipping.")
-                        continue
-
-                    price_element = container.select_one('.a-price .a-offscreen')
-                    if price_element:
-                        break
-
-        # Priority 2: Fallback to legacy selectors or generic (only if strict search failed)
-        # If url_asin is present, we DO NOT fallback to generic selectors to prevent scraping wrong variation prices.
-        if not price_element and not url_asin:
-            price_element = soup.select_one('.a-price .a-offscreen')
-
-            if not price_element:
-                price_element = soup.select_one('#priceblock_ourprice')
-            if not price_element:
-                price_element = soup.select_one('#priceblock_dealprice')
-
-        if not price_element:
-            # Only check price_whole if we don't have a verified ASIN (or if strict check passed but failed to get element which shouldn't happen if we broke loop)
-            # Actually, if url_asin is present, we shouldn't use .a-price-whole either as it's very generic.
-            if not url_asin:
-                # Sometimes price is in a span with class a-price-whole
-                price_whole = soup.select_one('.a-price-whole')
-                price_fraction = soup.select_one('.a-price-fraction')
-                if price_whole and price_fraction:
-                    whole = price_whole.get_text(strip=True).rstrip('.')
-                    fraction = price_fraction.get_text(strip=True)
-                    price_text = f"{whole}.{fraction}"
-                elif price_whole:
-                    price_text = price_whole.get_text(strip=True)
+            # Sometimes price is in a span with class a-price-whole
+            price_whole = _first(_XP_PRICE_WHOLE, tree)
+            price_fraction = _first(_XP_PRICE_FRACTION, tree)
+            if price_whole is not None and price_fraction is not None:
+                # The parts are already split, so build the price from their
+                # digits: one exact division gives the same float as parsing
+                # "whole.fraction", without the text round trip.
+                price_text = None
+                whole_digits = _NON_DIGIT_RE.sub('', _text(price_whole))
+                fraction_digits = _NON_DIGIT_RE.sub('', _text(price_fraction))
+                if whole_digits or fraction_digits:
+                    price = int(whole_digits + fraction_digits) / 10 ** len(fraction_digits)
                 else:
-                    price_text = None
+                    logger.warning(f"Could not parse price from text: {_text(price_whole)}{_text(price_fraction)}")
+            elif price_whole is not None:
+                price_text = _text(price_whole)
             else:
                 price_text = None
         else:
-            price_text = price_element.get_text(strip=True)
-
-        price = None
-        currency = '$' # Default
-
-        if price_text:
-            # Remove currency symbol and parse float
-            # Example: $19.99 -> 19.99
-            # Example: 1,234.56 -> 1234.56
-            # Remove non-numeric chars except dot
-            # But we might have commas.
-            # Assuming US locale for Amazon.com
-            clean_price_text = re.sub(r'[^\d.]', '', price_text)
-            try:
-                # If there are multiple dots (e.g. from some weird formatting), handle it?
-                # Usually it's fine.
-                price = float(clean_price_text)
-            except ValueError:
-                logger.warning(f"Could not parse price from text: {price_text}")
+            price_text = None
+    else:
+        price_text = _text(price_element)
+
+    currency = '$' # Default
+
+    if price_text:
+        # Remove currency symbol and parse float
+        # Example: $19.99 -> 19.99
+        # Example: 1,234.56 -> 1234.56
+        # Remove non-numeric chars except dot
+        # But we might have commas.
+        # Assuming US locale for Amazon.com
+        clean_price_text = _PRICE_CLEAN_RE.sub('', price_text)
+        try:
+            # If there are multiple dots (e.g. from some weird formatting), handle it?
+            # Usually it's fine.
+            price = float(clean_price_text)
+        except ValueError:
+            logger.warning(f"Could not parse price from text: {price_text}")
+
+    if price is None:
+        logger.warning(f"Could not find price for URL: {url}")
+
+    return price, title, currency
+
+
+def check_new_item_price(item_id, url):
+    """
+    Scrapes the first price, title and currency for a newly added item and
+    records them, along with its first price history entry, in one statement.
+    The name is left alone if the user already renamed the item.
+    """
+    logger.info(f"Fetching initial price for item {item_id} ({url})...")
+    price, title, currency = get_amazon_price(url)
+    if price is None:
+        logger.warning(f"Failed to fetch initial price for item {item_id}")
 
-        if price is None:
-            logger.warning(f"Could not find price for URL: {url}")
+    try:
+        with get_db_cursor(commit=True) as cur:
+            cur.execute("""
+                WITH checked AS (
+                    UPDATE tracked_items
+                    SET current_price = %s,
+                        currency = COALESCE(%s, currency),
+                        name = CASE WHEN is_custom_name THEN name ELSE COALESCE(%s, name) END,
+                        last_checked = NOW()
+                    WHERE id = %s
+                    RETURNING id, current_price
+                )
+                INSERT INTO price_history (tracked_item_id, price)
+                SELECT id, current_price FROM checked WHERE current_price IS NOT NULL
+            """, (price, currency, title, item_id))
+    except Exception as e:
+        logger.error(f"Failed to record initial price for item {item_id}: {e}")
 
-        return price, title, currency
+def submit_new_item_price_check(app, item_id, url):
+    """
+    Queues check_new_item_price on the app's price executor, so adding an item
+    returns without waiting for the Amazon scrape.
+    """
+    return app.price_executor.submit(check_new_item_price, item_id, url)
 
-    except requests.RequestException as e:
-        logger.error(f"Error fetching URL {url}: {e}")
-        return None, None, None
-    except Exception as e:
-        logger.error(f"Error parsing page {url}: {e}")
-        return None, None, None
+# The scheduled update writes prices in batches of this many items.
+PRICE_UPDATE_BATCH_SIZE = 500
+
+def record_prices_batch(rows):
+    """
+    Sets the current price, last checked time and name of each
+    (tracked_item_id, price, name) row, and records each price in
+    price_history, with a single statement however many rows there are.
+    A None name keeps the item's existing one.
+    """
+    if not rows:
+        return
+    item_ids, prices, names = zip(*rows)
+    with get_db_cursor(commit=True) as cur:
+        cur.execute("""
+            WITH updated AS (
+                UPDATE tracked_items AS t
+                SET current_price = v.price, last_checked = NOW(), name = COALESCE(v.name, t.name)
+                FROM unnest(%s::uuid[], %s::numeric[], %s::text[]) AS v(id, price, name)
+                WHERE t.id = v.id
+                RETURNING t.id, v.price
+            )
+            INSERT INTO price_history (tracked_item_id, price)
+            SELECT id, price FROM updated
+        """, (list(item_ids), list(prices), list(names)))
 
 def update_all_prices():
     """
@@ -200,7 +459,59 @@ def update_all_prices():
             logger.info("No items to track.")
             return
 
-        for item_data in items:
+        with get_db_cursor() as cur:
+            # Each item's latest recorded price, to spot drops. The lateral
+            # subquery takes one index probe per item instead of sorting their
+            # whole history.
+            cur.execute("""
+                SELECT t.id, h.price
+                FROM unnest(%s::uuid[]) AS t(id)
+                CROSS JOIN LATERAL (
+                    SELECT price
+                    FROM price_history
+                    WHERE tracked_item_id = t.id
+                    ORDER BY recorded_at DESC
+                    LIMIT 1
+                ) h
+            """, ([item_data[0] for item_data in items],))
+            last_prices = dict(cur.fetchall())
+
+            # Each owner's price drop webhook, if they set one
+            cur.execute("""
+                SELECT user_id, price_change_notification_webhook_url
+                FROM user_settings
+                WHERE user_id = ANY(%s::uuid[])
+            """, (list({item_data[2] for item_data in items}),))
+            webhooks = dict(cur.fetchall())
+
+        # Price drops to alert on, per webhook; each webhook gets its alerts in as few messages as possible
+        price_drops = {}
+
+        # Checked prices, written in batches rather than statements per item,
+        # and the drops found among them, alerted on once their batch is saved
+        price_rows = []
+        pending_drops = []
+        # Items whose fetch failed, touched together at the end
+        failed_ids = []
+
+        def flush_prices():
+            try:
+                record_prices_batch(price_rows)
+            except Exception as e:
+                logger.error(f"Failed to record prices for {len(price_rows)} items: {e}")
+            else:
+                for webhook_url, drop in pending_drops:
+                    price_drops.setdefault(webhook_url, []).append(drop)
+            price_rows.clear()
+            pending_drops.clear()
+
+        # Fetch every distinct page first, a few at a time, then process the results in order
+        urls = list(dict.fromkeys(item_data[1] for item_data in items))
+        with ThreadPoolExecutor(max_workers=PRICE_FETCH_WORKERS, thread_name_prefix='price-fetch') as executor:
+            results_by_url = dict(zip(urls, executor.map(_get_amazon_price_cached, urls)))
+        results = [results_by_url[item_data[1]] for item_data in items]
+
+        for item_data, (price, title, _) in zip(items, results):
             item_id = item_data[0]
             url = item_data[1]
             user_id = item_data[2]
@@ -210,7 +521,6 @@ def update_all_prices():
             is_custom_name = item_data[6]
 
             logger.info(f"Updating price for item {item_id} ({url})...")
-            price, title, _ = get_amazon_price(url)
 
             if is_custom_name and current_name:
                 # If name is custom, keep the existing name
@@ -223,79 +533,61 @@ def update_all_prices():
                     title = "Unknown Product"
 
             if price is not None:
-                try:
-                    with get_db_cursor(commit=True) as cur:
-                        # Fetch last entry before update to check price change
-                        cur.execute("""
-                            SELECT price, recorded_at
-                            FROM price_history
-                            WHERE tracked_item_id = %s
-                            ORDER BY recorded_at DESC
-                            LIMIT 1
-                        """, (item_id,))
-                        last_entry = cur.fetchone()
-
-                        last_price = float(last_entry[0]) if last_entry else None
-                        last_recorded_at = last_entry[1] if last_entry else None
-
-                        # Update current price and last checked timestamp
-                        cur.execute("""
-                            UPDATE tracked_items
-                            SET current_price = %s, last_checked = NOW(), name = COALESCE(%s, name)
-                            WHERE id = %s
-                        """, (price, title, item_id))
-
-                        # Always insert into history to ensure hourly tracking
-                        cur.execute("""
-                            INSERT INTO price_history (tracked_item_id, price)
-                            VALUES (%s, %s)
-                        """, (item_id, price))
-                        logger.info(f"Updated price for item {item_id} to {price} (History added)")
-
-                        # Notification Logic
-                        if last_price is not None and price < last_price:
-                            should_notify = False
-                            price_change = price - last_price
-                            price_change_percent = (price_change / last_price) * 100
-
-                            # Check threshold if configured
-                            if threshold_value is not None:
-                                if threshold_type == 'percent':
-                                    if abs(price_change_percent) >= float(threshold_value):
-                                        should_notify = True
-                                elif threshold_type == 'absolute':
-                                    if abs(price_change) >= float(threshold_value):
-                                        should_notify = True
-
-                            if should_notify:
-                                # Fetch user's webhook URL
-                                cur.execute("SELECT price_change_notification_webhook_url FROM user_settings WHERE user_id = %s", (user_id,))
-                                settings_row = cur.fetchone()
-                                webhook_url = settings_row[0] if settings_row else None
-
-                                if webhook_url:
-                                    send_price_drop_notification(
-                                        webhook_url,
-                                        item_name=title,
-                                        current_price=price,
-                                        previous_price=last_price,
-                                        url=url
-                                    )
-
-                except Exception as e:
-                    logger.error(f"Failed to update database for item {item_id}: {e}")
+                last_price = float(last_prices[item_id]) if item_id in last_prices else None
+
+                # Update current price and last checked timestamp, and always
+                # record history to ensure hourly tracking
+                price_rows.append((item_id, price, title))
+                logger.info(f"Queued price {price} for item {item_id}")
+
+                # Notification Logic
+                if last_price is not None and price < last_price:
+                    should_notify = False
+                    price_change = price - last_price
+                    price_change_percent = (price_change / last_price) * 100
+
+                    # Check threshold if configured
+                    if threshold_value is not None:
+                        if threshold_type == 'percent':
+                            if abs(price_change_percent) >= float(threshold_value):
+                                should_notify = True
+                        elif threshold_type == 'absolute':
+                            if abs(price_change) >= float(threshold_value):
+                                should_notify = True
+
+                    if should_notify:
+                        webhook_url = webhooks.get(user_id)
+
+                        if webhook_url:
+                            pending_drops.append((webhook_url, {
+                                'item_name': title,
+                                'current_price': price,
+                                'previous_price': last_price,
+                                'url': url
+                            }))
+
+                if len(price_rows) >= PRICE_UPDATE_BATCH_SIZE:
+                    flush_prices()
             else:
                 logger.warning(f"Failed to fetch price for item {item_id}")
-                try:
-                    with get_db_cursor(commit=True) as cur:
-                        cur.execute("""
-                            UPDATE tracked_items
-                            SET last_checked = NOW()
-                            WHERE id = %s
-                        """, (item_id,))
-                except Exception as e:
-                    logger.error(f"Failed to update last_checked for item {item_id}: {e}")
+                failed_ids.append(item_id)
 
+        flush_prices()
+
+        # Items whose page couldn't be scraped still count as checked
+        if failed_ids:
+            try:
+                with get_db_cursor(commit=True) as cur:
+                    cur.execute("""
+                        UPDATE tracked_items
+                        SET last_checked = NOW()
+                        WHERE id = ANY(%s::uuid[])
+                    """, (failed_ids,))
+            except Exception as e:
+                logger.error(f"Failed to update last_checked for {len(failed_ids)} items: {e}")
+
+        for webhook_url, drops in price_drops.items():
+            queue_price_drop_notifications(webhook_url, drops)
         logger.info("Finished scheduled price update.")
 
     except Exception as e:
@@ -1,5 +1,3 @@
-import json
-import threading
 import pytz
 import os
 from datetime import datetime
@@ -13,40 +11,21 @@ def run_scheduled_sync(app, user_id):
     This function is triggered by the APScheduler to run a scheduled sync.
     It calls the existing run_manual_ingestion_job but logs it as a scheduled job.
     """
-    from backend.api.services.ingestion_service import run_manual_ingestion_job
+    from backend.api.services.ingestion_service import create_job, submit_ingestion_job
 
     with app.app_context():
-        # Check if a scheduled job is already running to prevent overlap
-        with get_db_cursor() as cur:
-            cur.execute(
-                "SELECT id FROM ingestion_jobs WHERE user_id = %s AND status = 'running' AND job_type = 'scheduled'",
-                (user_id,)
-            )
-            if cur.fetchone():
-                app.logger.info(f"Skipping scheduled sync for user {user_id}: a scheduled job is already running.")
-                return
-
-        # Create a new scheduled job record
         with get_db_cursor(commit=True) as cur:
-            cur.execute(
-                """
-                INSERT INTO ingestion_jobs (user_id, job_type, status, details)
-                VALUES (%s, 'scheduled', 'pending', %s) RETURNING id
-                """,
-                (user_id, json.dumps({'log': ['Scheduled job created...']}))
-            )
-            job_id = cur.fetchone()[0]
+            job_id = create_job(cur, user_id, 'scheduled', 'Scheduled job created...')
+
+        if job_id is None:
+            app.logger.info(f"Skipping scheduled sync for user {user_id}: a scheduled job is already running.")
+            return
 
         app.logger.info(f"Starting scheduled sync for user {user_id} (Job ID: {job_id}).")
 
         # We can reuse run_manual_ingestion_job since it takes the job_id and updates it.
         # Fetch only the last 3 days for scheduled daily syncs to catch errors from the previous execution.
-        thread = threading.Thread(
-            target=run_manual_ingestion_job,
-            kwargs={'app': app, 'user_id': user_id, 'job_id': job_id, 'days': 3, 'debug': False, 'job_type': 'scheduled'}
-        )
-        thread.daemon = True
-        thread.start()
+        submit_ingestion_job(app, user_id=user_id, job_id=job_id, days=3, debug=False, job_type='scheduled')
 
 
 def check_scheduled_syncs(app):
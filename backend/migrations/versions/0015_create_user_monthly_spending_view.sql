@@ -0,0 +1,15 @@
+-- Precompute per-user monthly spending so the dashboard reads one row per month
+-- instead of aggregating every order on each request.
+-- Refreshed by the ingestion job after it writes new orders.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS user_monthly_spending AS
+SELECT
+    user_id,
+    DATE_TRUNC('month', order_placed_date) AS month,
+    SUM(grand_total - COALESCE(refund_total, 0.0)) AS total_spending,
+    COUNT(order_id) AS order_count
+FROM orders
+GROUP BY user_id, DATE_TRUNC('month', order_placed_date);
+
+-- Required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_monthly_spending_user_month ON user_monthly_spending(user_id, month);
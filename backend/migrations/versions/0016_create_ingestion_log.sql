@@ -0,0 +1,12 @@
+-- Append-only log of ingestion job status lines.
+-- Replaces rewriting the whole details->'log' array on every flush; status reads
+-- only fetch the most recent lines.
+
+CREATE TABLE IF NOT EXISTS ingestion_log (
+    seq BIGSERIAL PRIMARY KEY,
+    job_id UUID NOT NULL REFERENCES ingestion_jobs(id) ON DELETE CASCADE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    line TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_ingestion_log_job_id_seq ON ingestion_log(job_id, seq);
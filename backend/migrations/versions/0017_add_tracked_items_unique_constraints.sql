@@ -0,0 +1,26 @@
+-- Enforce one tracked item per product per user in the database, so adding an
+-- item can insert with ON CONFLICT DO NOTHING instead of checking first.
+
+-- Drop duplicates left by concurrent adds, keeping each user's earliest copy of
+-- each product (their price history goes with them). Duplicates by ASIN are
+-- dropped first, then by URL among the rows that remain, so a row is only ever
+-- dropped in favor of one that is kept. Items without an ASIN are left to the
+-- URL pass, as the unique index allows any number of NULL ASINs.
+DELETE FROM tracked_items
+WHERE asin IS NOT NULL
+  AND id NOT IN (
+    SELECT DISTINCT ON (user_id, asin) id
+    FROM tracked_items
+    WHERE asin IS NOT NULL
+    ORDER BY user_id, asin, created_at, id
+  );
+
+DELETE FROM tracked_items
+WHERE id NOT IN (
+    SELECT DISTINCT ON (user_id, url) id
+    FROM tracked_items
+    ORDER BY user_id, url, created_at, id
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tracked_items_user_asin ON tracked_items(user_id, asin);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tracked_items_user_url ON tracked_items(user_id, url);
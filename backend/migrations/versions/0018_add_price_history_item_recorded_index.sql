@@ -0,0 +1,6 @@
+-- Lets price history reads fetch only an item's rows in the requested time range
+-- (or its latest row) instead of reading its entire history and filtering.
+CREATE INDEX IF NOT EXISTS idx_price_history_item_recorded_at ON price_history(tracked_item_id, recorded_at);
+
+-- Covered by the index above.
+DROP INDEX IF EXISTS idx_price_history_item_id;
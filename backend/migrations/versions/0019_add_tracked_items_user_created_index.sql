@@ -0,0 +1,6 @@
+-- Returns a user's tracked items already in list order (newest first) instead of
+-- sorting them on every request.
+CREATE INDEX IF NOT EXISTS idx_tracked_items_user_created_at ON tracked_items(user_id, created_at DESC);
+
+-- Covered by the index above.
+DROP INDEX IF EXISTS idx_tracked_items_user_id;
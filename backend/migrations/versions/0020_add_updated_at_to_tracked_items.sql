@@ -0,0 +1,9 @@
+-- Moves whenever an item is edited or a price is recorded for it, so the tracked
+-- item list can tell whether anything changed from the items alone.
+ALTER TABLE tracked_items ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+
+DROP TRIGGER IF EXISTS update_tracked_items_updated_at ON tracked_items;
+CREATE TRIGGER update_tracked_items_updated_at
+BEFORE UPDATE ON tracked_items
+FOR EACH ROW
+EXECUTE FUNCTION update_updated_at_column();
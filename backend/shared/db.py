@@ -1,7 +1,9 @@
 # shared/db.py
 import os
 import logging
+import threading
 from contextlib import contextmanager
+import psycopg2
 from psycopg2 import pool
 from dotenv import load_dotenv
 
@@ -10,27 +12,94 @@ load_dotenv()
 
 # --- Connection Pool Initialization ---
 connection_pool = None
+# Bounds concurrent checkouts so callers wait for a free connection instead of
+# failing immediately with "connection pool exhausted".
+_pool_slots = None
+# Per worker process; with the default four Gunicorn workers the defaults keep
+# between 8 and 40 connections open to Postgres.
+POOL_MIN_CONNECTIONS = int(os.environ.get('DB_POOL_MIN_CONNECTIONS', 2))
+POOL_MAX_CONNECTIONS = int(os.environ.get('DB_POOL_MAX_CONNECTIONS', 10))
+POOL_TIMEOUT_SECONDS = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+# Checkouts that had to wait for a free connection, and those that gave up.
+_pool_waits = 0
+_pool_timeouts = 0
+
+def _connection_params():
+    """Connection settings shared by the pool and dedicated connections."""
+    return dict(
+        dbname=os.environ.get('POSTGRES_DB'),
+        user=os.environ.get('POSTGRES_USER'),
+        password=os.environ.get('POSTGRES_PASSWORD'),
+        host=os.environ.get('POSTGRES_HOST', 'localhost'),
+        port=os.environ.get('POSTGRES_PORT'),
+        # Detect connections silently dropped by the network (e.g. a NAT or
+        # firewall timing out idle pooled connections) instead of hanging on them.
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=3,
+        tcp_user_timeout=15000,
+    )
 
 def init_pool():
     """Initializes the database connection pool."""
-    global connection_pool
+    global connection_pool, _pool_slots
     if connection_pool is None:
         try:
             logging.info("Initializing database connection pool...")
-            connection_pool = pool.SimpleConnectionPool(
-                minconn=1,
-                maxconn=10,
-                dbname=os.environ.get('POSTGRES_DB'),
-                user=os.environ.get('POSTGRES_USER'),
-                password=os.environ.get('POSTGRES_PASSWORD'),
-                host=os.environ.get('POSTGRES_HOST', 'localhost'),
-                port=os.environ.get('POSTGRES_PORT')
+            # Request handlers, background ingestion threads and the scheduler all
+            # share this pool, so it must be the thread-safe variant.
+            connection_pool = pool.ThreadedConnectionPool(
+                minconn=POOL_MIN_CONNECTIONS,
+                maxconn=POOL_MAX_CONNECTIONS,
+                **_connection_params()
             )
+            _pool_slots = threading.BoundedSemaphore(POOL_MAX_CONNECTIONS)
             logging.info("Database connection pool initialized successfully.")
         except Exception as e:
             logging.exception("Failed to initialize database connection pool.")
             raise e
 
+def _getconn():
+    """Checks out a connection, waiting up to POOL_TIMEOUT_SECONDS for one to free up."""
+    global _pool_waits, _pool_timeouts
+    if not _pool_slots.acquire(blocking=False):
+        _pool_waits += 1
+        if not _pool_slots.acquire(timeout=POOL_TIMEOUT_SECONDS):
+            _pool_timeouts += 1
+            raise pool.PoolError(f"Timed out after {POOL_TIMEOUT_SECONDS}s waiting for a database connection.")
+    try:
+        return connection_pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+
+def _putconn(conn):
+    """Returns a connection to the pool and frees its slot."""
+    try:
+        connection_pool.putconn(conn)
+    finally:
+        _pool_slots.release()
+
+def pool_stats():
+    """
+    Snapshot of this process's pool, for tuning DB_POOL_MIN/MAX_CONNECTIONS.
+    `waits` and `timeouts` count checkouts since startup that found the pool
+    exhausted, and those that then gave up after DB_POOL_TIMEOUT.
+    """
+    if not connection_pool:
+        return None
+    in_use = len(connection_pool._used)
+    idle = len(connection_pool._pool)
+    return {
+        "in_use": in_use,
+        "idle": idle,
+        "open": in_use + idle,
+        "max": POOL_MAX_CONNECTIONS,
+        "waits": _pool_waits,
+        "timeouts": _pool_timeouts,
+    }
+
 def close_pool():
     """Closes all connections in the pool."""
     global connection_pool
@@ -40,18 +109,72 @@ def close_pool():
         connection_pool = None
 
 @contextmanager
-def get_db_cursor(commit=False):
+def get_db_connection():
+    """
+    Borrows a raw connection from the pool for a longer unit of work, such as a
+    background job issuing many statements. The caller opens cursors and commits
+    explicitly; any uncommitted work is rolled back when the connection is returned.
+    """
+    if not connection_pool:
+        raise Exception("Database connection pool is not initialized. Call init_pool() first.")
+
+    conn = _getconn()
+    try:
+        yield conn
+    except Exception as e:
+        conn.rollback()
+        logging.exception("Database transaction failed.")
+        raise e
+    finally:
+        _putconn(conn)
+
+@contextmanager
+def get_dedicated_connection():
+    """
+    Opens a connection outside the pool for long-lived sessions, such as a
+    LISTEN that would otherwise hold a pooled connection for minutes. The
+    connection is closed on exit.
+    """
+    conn = psycopg2.connect(**_connection_params())
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def try_advisory_lock(name):
+    """
+    Tries to take the session-level advisory lock `name` on a new connection
+    outside the pool. Returns that connection, which holds the lock until it is
+    closed, or None if another session (possibly on another host) holds it.
+    """
+    conn = psycopg2.connect(**_connection_params())
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (name,))
+            acquired = cur.fetchone()[0]
+    except Exception:
+        conn.close()
+        raise
+    if not acquired:
+        conn.close()
+        return None
+    return conn
+
+@contextmanager
+def get_db_cursor(commit=False, cursor_factory=None):
     """
     Provides a database cursor from the connection pool. This context manager
     handles connection borrowing, returning, and transaction logic automatically.
+    Pass cursor_factory=RealDictCursor to get rows back as dicts.
     """
     if not connection_pool:
         raise Exception("Database connection pool is not initialized. Call init_pool() first.")
 
     conn = None
     try:
-        conn = connection_pool.getconn()
-        with conn.cursor() as cur:
+        conn = _getconn()
+        with conn.cursor(cursor_factory=cursor_factory) as cur:
             yield cur
             if commit:
                 conn.commit()
@@ -62,4 +185,4 @@ def get_db_cursor(commit=False):
         raise e
     finally:
         if conn:
-            connection_pool.putconn(conn)
+            _putconn(conn)
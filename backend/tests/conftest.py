@@ -1,6 +1,21 @@
 import os
+import sys
+from unittest.mock import MagicMock
 
 # Set required environment variables for tests before any backend modules are imported
 os.environ['SECRET_KEY'] = 'test-secret-key'
 os.environ['JWT_SECRET_KEY'] = 'test-jwt-secret-key-long-enough'
 os.environ['ENCRYPTION_KEY'] = 'test-encryption-key-for-fernet'
+
+# Stub out the Amazon client library, which the ingestion code imports but no
+# test talks to. This runs once, before any test module is collected; a
+# session fixture would run too late, after the modules importing it.
+_STUBBED_MODULES = (
+    'amazonorders',
+    'amazonorders.session',
+    'amazonorders.orders',
+    'amazonorders.transactions',
+    'amazonorders.exception',
+)
+for _name in _STUBBED_MODULES:
+    sys.modules.setdefault(_name, MagicMock())
@@ -9,9 +9,13 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')
 
 # Import the function to test
 from backend.api.services.price_service import update_all_prices
+from backend.api.services import price_service
 
 class TestCustomNameLogic(unittest.TestCase):
 
+    def setUp(self):
+        price_service._price_cache.clear()
+
     @patch('backend.api.services.price_service.get_db_cursor')
     @patch('backend.api.services.price_service.get_amazon_price')
     def test_custom_name_respected(self, mock_get_price, mock_get_db_cursor):
@@ -22,15 +26,15 @@ class TestCustomNameLogic(unittest.TestCase):
         # Mock items: (id, url, user_id, type, val, current_name, is_custom_name)
         # Item 1: Custom name "My Custom Item", Scraper returns "Amazon Title"
         mock_cursor.fetchall.side_effect = [
-            [(1, 'http://url.com/1', 'user1', 'percent', 10, 'My Custom Item', True)]
+            [(1, 'http://url.com/1', 'user1', 'percent', 10, 'My Custom Item', True)],
+            # Last price same as new, no webhooks
+            [(1, 100.0)],
+            [],
         ]
 
         # Scraper returns: (price, title, currency)
         mock_get_price.return_value = (100.0, "Amazon Title", "$")
 
-        # Mock last entry check (price same, no history update needed)
-        mock_cursor.fetchone.return_value = (100.0, datetime.now())
-
         update_all_prices()
 
         # Check what was passed to UPDATE
@@ -44,8 +48,8 @@ class TestCustomNameLogic(unittest.TestCase):
             if "UPDATE tracked_items" in query:
                 found_update = True
                 params = args[1]
-                # Params: (price, title, item_id)
-                updated_title = params[1]
+                # Params: (item_ids, prices, titles)
+                updated_title = params[2][0]
                 self.assertEqual(updated_title, "My Custom Item", "Should preserve custom name")
                 self.assertNotEqual(updated_title, "Amazon Title", "Should NOT use scraped title")
 
@@ -60,11 +64,12 @@ class TestCustomNameLogic(unittest.TestCase):
 
         # Item 1: Auto name "Old Name", Scraper returns "New Amazon Title", is_custom_name=False
         mock_cursor.fetchall.side_effect = [
-            [(1, 'http://url.com/1', 'user1', 'percent', 10, 'Old Name', False)]
+            [(1, 'http://url.com/1', 'user1', 'percent', 10, 'Old Name', False)],
+            [(1, 100.0)],
+            [],
         ]
 
         mock_get_price.return_value = (100.0, "New Amazon Title", "$")
-        mock_cursor.fetchone.return_value = (100.0, datetime.now())
 
         update_all_prices()
 
@@ -76,7 +81,7 @@ class TestCustomNameLogic(unittest.TestCase):
             if "UPDATE tracked_items" in query:
                 found_update = True
                 params = args[1]
-                updated_title = params[1]
+                updated_title = params[2][0]
                 self.assertEqual(updated_title, "New Amazon Title", "Should update to scraped title")
 
         self.assertTrue(found_update)
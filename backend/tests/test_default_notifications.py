@@ -1,21 +1,13 @@
-import sys
 import unittest
 from unittest.mock import MagicMock, patch
 from flask import Flask
 from flask_jwt_extended import JWTManager, create_access_token
 
-# Mock dependencies
-sys.modules['amazonorders'] = MagicMock()
-sys.modules['amazonorders.session'] = MagicMock()
-sys.modules['amazonorders.orders'] = MagicMock()
-sys.modules['amazonorders.transactions'] = MagicMock()
-sys.modules['amazonorders.exception'] = MagicMock()
-
 # Import blueprints
-# We need to ensure we can import them. Since we mocked amazonorders, it should be fine.
+# We need to ensure we can import them. conftest.py stubs out amazonorders, so it should be fine.
 # We also need to mock backend.shared.db if it does DB connection on import? No, it just defines functions.
 
-from backend.api.routes.settings import settings_bp
+from backend.api.routes.settings import settings_bp, _USER_SETTINGS_FIELDS
 from backend.api.routes.price_tracking import price_tracking_bp
 
 class TestDefaultNotifications(unittest.TestCase):
@@ -63,49 +55,44 @@ class TestDefaultNotifications(unittest.TestCase):
         sql = call_args[0][0]
         params = call_args[0][1]
 
-        # Check if dynamic SQL constructed correctly
-        # sql is a psycopg2.sql.SQL object, so we convert it to string using context=None if possible
-        # or we just check the string representation
-        sql_str = repr(sql)
-
-        self.assertIn("INSERT INTO user_settings", sql_str)
-        self.assertIn("default_notification_threshold_type", sql_str)
-        self.assertIn("default_notification_threshold_value", sql_str)
+        self.assertIn("INSERT INTO user_settings", sql)
+        self.assertIn("default_notification_threshold_type", sql)
+        self.assertIn("default_notification_threshold_value", sql)
         # Check if ON CONFLICT DO UPDATE is present
-        self.assertIn("ON CONFLICT (user_id) DO UPDATE SET", sql_str)
+        self.assertIn("ON CONFLICT (user_id) DO UPDATE SET", sql)
 
         # Verify values passed
         self.assertIn('user-123', params)
         self.assertIn('absolute', params)
         self.assertIn(15.50, params)
 
-        # Verify that other columns like amazon_email are NOT in the query (since we didn't pass them)
-        self.assertNotIn("amazon_email", sql_str)
+        # The statement covers every column, but only the submitted ones are marked
+        # for update, so other columns like amazon_email keep their stored values
+        columns = [column for _, column, _ in _USER_SETTINGS_FIELDS]
+        provided = dict(zip(columns, params[1 + len(columns):]))
+        self.assertTrue(provided['default_notification_threshold_type'])
+        self.assertTrue(provided['default_notification_threshold_value'])
+        self.assertFalse(provided['amazon_email'])
+        self.assertFalse(provided['amazon_password_encrypted'])
 
 
     @patch('backend.api.routes.price_tracking.get_db_cursor')
-    @patch('backend.api.routes.price_tracking.get_amazon_price')
-    def test_add_tracked_item_with_defaults(self, mock_get_amazon_price, mock_get_db_cursor):
-        # Mock Amazon Price
-        mock_get_amazon_price.return_value = (99.99, "Test Product", "$")
+    @patch('backend.api.routes.price_tracking.submit_new_item_price_check')
+    def test_add_tracked_item_with_defaults(self, mock_submit_price_check, mock_get_db_cursor):
 
         # Mock DB Cursor
         mock_cursor = MagicMock()
         mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
 
-        # Mock fetchone for check existing (return None)
-        # Then fetchone for RETURNING clause (return new item)
-        mock_cursor.fetchone.side_effect = [
-            None, # Check existing
-            (1, "Test Product", 99.99, "$") # RETURNING clause
-        ]
+        # fetchone returns the inserted item's id from the RETURNING clause
+        mock_cursor.fetchone.return_value = (1,)
 
         with self.app.app_context():
             token = create_access_token(identity='user-123')
             headers = {'Authorization': f'Bearer {token}'}
 
         payload = {
-            'url': 'http://amazon.com/dp/B00000',
+            'url': 'http://amazon.com/dp/B000000000',
             'notification_threshold_type': 'percent',
             'notification_threshold_value': 10
         }
@@ -119,12 +106,12 @@ class TestDefaultNotifications(unittest.TestCase):
         self.assertEqual(response.status_code, 201)
 
         # Verify SQL
-        # First call is check existing
-        # Second call is INSERT tracked_items
-        # Third call is INSERT price_history
-        self.assertEqual(mock_cursor.execute.call_count, 3)
+        # The item is inserted in a single statement; its price is scraped in the background
+        self.assertEqual(mock_cursor.execute.call_count, 1)
+        mock_submit_price_check.assert_called_once()
+        self.assertEqual(mock_submit_price_check.call_args[0][1:], (1, 'http://amazon.com/dp/B000000000'))
 
-        insert_call = mock_cursor.execute.call_args_list[1]
+        insert_call = mock_cursor.execute.call_args_list[0]
         sql = insert_call[0][0]
         params = insert_call[0][1]
 
@@ -1,5 +1,5 @@
 import sys
-import unittest
+import pytest
 from unittest.mock import patch, call, MagicMock
 from datetime import datetime, timedelta
 import os
@@ -8,119 +8,125 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from backend.api.services.price_service import update_all_prices
-
-class TestPriceNotifications(unittest.TestCase):
-
-    @patch('backend.api.services.price_service.send_price_drop_notification')
-    @patch('backend.api.services.price_service.get_db_cursor')
-    @patch('backend.api.services.price_service.get_amazon_price')
-    def test_notification_sent_percent(self, mock_get_price, mock_get_db_cursor, mock_send_notification):
-        """Test notification sent when price drops by percentage threshold."""
-        mock_cursor = MagicMock()
-        mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
-
-        # Mock Fetch Items
-        # id, url, user_id, notification_threshold_type, notification_threshold_value, name, is_custom_name
-        mock_cursor.fetchall.side_effect = [
-            [('item_1', 'http://example.com/1', 'user_1', 'percent', 10.0, 'Item 1', False)]
-        ]
-
-        # Mock Fetch Last Price
-        # Return an old price of 100.0
-        mock_cursor.fetchone.side_effect = [
-            (100.0, datetime.now() - timedelta(days=1)), # Last price entry
-            ('http://webhook.com',), # user settings webhook
-        ]
-
-        # Mock New Price: 80.0 (20% drop, > 10% threshold)
-        mock_get_price.return_value = (80.0, "Test Product", "$")
-
-        update_all_prices()
-
-        # Verify send_price_drop_notification was called
-        self.assertTrue(mock_send_notification.called)
-        args, kwargs = mock_send_notification.call_args
-        self.assertEqual(args[0], 'http://webhook.com')
-        self.assertEqual(kwargs['item_name'], "Test Product")
-        self.assertEqual(kwargs['current_price'], 80.0)
-        self.assertEqual(kwargs['previous_price'], 100.0)
-
-    @patch('backend.api.services.price_service.send_price_drop_notification')
-    @patch('backend.api.services.price_service.get_db_cursor')
-    @patch('backend.api.services.price_service.get_amazon_price')
-    def test_notification_not_sent_percent_small_drop(self, mock_get_price, mock_get_db_cursor, mock_send_notification):
-        """Test notification NOT sent when price drops by less than percentage threshold."""
-        mock_cursor = MagicMock()
-        mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
-
-        mock_cursor.fetchall.side_effect = [
-            [('item_1', 'http://example.com/1', 'user_1', 'percent', 10.0, 'Item 1', False)]
-        ]
-
+from backend.api.services import price_service
+from backend.api.services.notification_service import send_price_drop_notifications_bulk
+
+@pytest.fixture(autouse=True)
+def clear_price_cache():
+    price_service._price_cache.clear()
+
+@patch('backend.api.services.price_service.queue_price_drop_notifications')
+@patch('backend.api.services.price_service.get_db_cursor')
+@patch('backend.api.services.price_service.get_amazon_price')
+def test_notification_sent_percent(mock_get_price, mock_get_db_cursor, mock_send_notification):
+    """Test notification sent when price drops by percentage threshold."""
+    mock_cursor = MagicMock()
+    mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
+
+    # Mock Fetch Items
+    # id, url, user_id, notification_threshold_type, notification_threshold_value, name, is_custom_name
+    mock_cursor.fetchall.side_effect = [
+        [('item_1', 'http://example.com/1', 'user_1', 'percent', 10.0, 'Item 1', False)],
+        # Last prices: an old price of 100.0
+        [('item_1', 100.0)],
+        # User settings webhooks
+        [('user_1', 'http://webhook.com')],
+    ]
+
+    # Mock New Price: 80.0 (20% drop, > 10% threshold)
+    mock_get_price.return_value = (80.0, "Test Product", "$")
+
+    update_all_prices()
+
+    # Verify the drop was sent to the user's webhook
+    assert mock_send_notification.called
+    webhook_url, drops = mock_send_notification.call_args.args
+    assert webhook_url == 'http://webhook.com'
+    assert len(drops) == 1
+    assert drops[0]['item_name'] == "Test Product"
+    assert drops[0]['current_price'] == 80.0
+    assert drops[0]['previous_price'] == 100.0
+
+@patch('backend.api.services.price_service.queue_price_drop_notifications')
+@patch('backend.api.services.price_service.get_db_cursor')
+@patch('backend.api.services.price_service.get_amazon_price')
+def test_notification_not_sent_percent_small_drop(mock_get_price, mock_get_db_cursor, mock_send_notification):
+    """Test notification NOT sent when price drops by less than percentage threshold."""
+    mock_cursor = MagicMock()
+    mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
+
+    mock_cursor.fetchall.side_effect = [
+        [('item_1', 'http://example.com/1', 'user_1', 'percent', 10.0, 'Item 1', False)],
         # Old price 100.0
-        mock_cursor.fetchone.side_effect = [
-            (100.0, datetime.now() - timedelta(days=1)),
-        ]
+        [('item_1', 100.0)],
+        [],
+    ]
 
-        # New Price: 95.0 (5% drop, < 10% threshold)
-        mock_get_price.return_value = (95.0, "Test Product", "$")
+    # New Price: 95.0 (5% drop, < 10% threshold)
+    mock_get_price.return_value = (95.0, "Test Product", "$")
 
-        update_all_prices()
+    update_all_prices()
 
-        self.assertFalse(mock_send_notification.called)
+    assert not mock_send_notification.called
 
-    @patch('backend.api.services.price_service.send_price_drop_notification')
-    @patch('backend.api.services.price_service.get_db_cursor')
-    @patch('backend.api.services.price_service.get_amazon_price')
-    def test_notification_sent_absolute(self, mock_get_price, mock_get_db_cursor, mock_send_notification):
-        """Test notification sent when price drops by absolute threshold."""
-        mock_cursor = MagicMock()
-        mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
-
-        # Threshold $5
-        mock_cursor.fetchall.side_effect = [
-            [('item_1', 'http://example.com/1', 'user_1', 'absolute', 5.0, 'Item 1', False)]
-        ]
+@patch('backend.api.services.price_service.queue_price_drop_notifications')
+@patch('backend.api.services.price_service.get_db_cursor')
+@patch('backend.api.services.price_service.get_amazon_price')
+def test_notification_sent_absolute(mock_get_price, mock_get_db_cursor, mock_send_notification):
+    """Test notification sent when price drops by absolute threshold."""
+    mock_cursor = MagicMock()
+    mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
 
+    # Threshold $5
+    mock_cursor.fetchall.side_effect = [
+        [('item_1', 'http://example.com/1', 'user_1', 'absolute', 5.0, 'Item 1', False)],
         # Old price 100.0
-        mock_cursor.fetchone.side_effect = [
-            (100.0, datetime.now() - timedelta(days=1)),
-            ('http://webhook.com',),
-        ]
-
-        # New Price: 90.0 ($10 drop, > $5 threshold)
-        mock_get_price.return_value = (90.0, "Test Product", "$")
-
-        update_all_prices()
-
-        self.assertTrue(mock_send_notification.called)
-        # Verify call args
-        args, kwargs = mock_send_notification.call_args
-        self.assertEqual(kwargs['current_price'], 90.0)
-
-    @patch('backend.api.services.price_service.send_price_drop_notification')
-    @patch('backend.api.services.price_service.get_db_cursor')
-    @patch('backend.api.services.price_service.get_amazon_price')
-    def test_notification_no_webhook(self, mock_get_price, mock_get_db_cursor, mock_send_notification):
-        """Test notification NOT sent if user has no webhook configured."""
-        mock_cursor = MagicMock()
-        mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
-
-        mock_cursor.fetchall.side_effect = [
-            [('item_1', 'http://example.com/1', 'user_1', 'percent', 10.0, 'Item 1', False)]
-        ]
-
-        mock_cursor.fetchone.side_effect = [
-            (100.0, datetime.now() - timedelta(days=1)),
-            (None,), # No webhook
-        ]
-
-        # New Price: 80.0
-        mock_get_price.return_value = (80.0, "Test Product", "$")
-
-        update_all_prices()
-
-        self.assertFalse(mock_send_notification.called)
-
-if __name__ == '__main__':
-    unittest.main()
+        [('item_1', 100.0)],
+        [('user_1', 'http://webhook.com')],
+    ]
+
+    # New Price: 90.0 ($10 drop, > $5 threshold)
+    mock_get_price.return_value = (90.0, "Test Product", "$")
+
+    update_all_prices()
+
+    assert mock_send_notification.called
+    # Verify call args
+    webhook_url, drops = mock_send_notification.call_args.args
+    assert drops[0]['current_price'] == 90.0
+
+@patch('backend.api.services.price_service.queue_price_drop_notifications')
+@patch('backend.api.services.price_service.get_db_cursor')
+@patch('backend.api.services.price_service.get_amazon_price')
+def test_notification_no_webhook(mock_get_price, mock_get_db_cursor, mock_send_notification):
+    """Test notification NOT sent if user has no webhook configured."""
+    mock_cursor = MagicMock()
+    mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
+
+    mock_cursor.fetchall.side_effect = [
+        [('item_1', 'http://example.com/1', 'user_1', 'percent', 10.0, 'Item 1', False)],
+        [('item_1', 100.0)],
+        [('user_1', None)], # No webhook
+    ]
+
+    # New Price: 80.0
+    mock_get_price.return_value = (80.0, "Test Product", "$")
+
+    update_all_prices()
+
+    assert not mock_send_notification.called
+
+@patch('backend.api.services.notification_service._session')
+def test_bulk_notifications_batched_and_deduplicated(mock_session):
+    """Test drops are sent up to 10 embeds per message, with repeats sent once."""
+    drops = [
+        {'item_name': f"Item {i}", 'current_price': 80.0, 'previous_price': 100.0, 'url': f"http://example.com/{i}"}
+        for i in range(12)
+    ]
+    drops.append(dict(drops[0]))
+
+    assert send_price_drop_notifications_bulk('http://webhook.com', drops)
+
+    posted = [kwargs['json']['embeds'] for args, kwargs in mock_session.post.call_args_list]
+    assert [len(embeds) for embeds in posted] == [10, 2]
+    assert posted[0][0]['description'] == "The price of [Item 0](http://example.com/0) has dropped!"
@@ -1,4 +1,4 @@
-import unittest
+import pytest
 from unittest.mock import patch, MagicMock
 import sys
 import os
@@ -6,137 +6,198 @@ import os
 # Add backend to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+from backend.api.services import price_service
 from backend.api.services.price_service import get_amazon_price
 
-class TestPriceService(unittest.TestCase):
-    @patch('backend.api.services.price_service.UserAgent')
-    @patch('requests.get')
-    def test_get_amazon_price_success(self, mock_get, mock_ua):
-        # Mock HTML content
-        html_content = """
-        <html>
-            <div id="productTitle">Test Product</div>
+# Skip the polite pause before each Amazon request
+@pytest.fixture(autouse=True)
+def no_fetch_delay(monkeypatch):
+    monkeypatch.setattr(price_service, 'FETCH_DELAY_SECONDS', (0, 0))
+
+@patch('backend.api.services.price_service.UserAgent')
+@patch('backend.api.services.price_service._session.get')
+def test_get_amazon_price_success(mock_get, mock_ua):
+    # Mock HTML content
+    html_content = """
+    <html>
+        <div id="productTitle">Test Product</div>
+        <span class="a-price">
+            <span class="a-offscreen">$19.99</span>
+        </span>
+    </html>
+    """
+    mock_response = MagicMock()
+    mock_response.iter_content.return_value = [html_content.encode('utf-8')]
+    mock_response.raise_for_status.return_value = None
+    mock_response.url = "http://example.com"
+    mock_get.return_value = mock_response
+
+    price, title, currency = get_amazon_price("http://example.com")
+    assert price == 19.99
+    assert title == "Test Product"
+    assert currency == "$"
+
+@patch('backend.api.services.price_service.UserAgent')
+@patch('backend.api.services.price_service._session.get')
+def test_get_amazon_price_fraction(mock_get, mock_ua):
+    # Mock HTML content with whole/fraction
+    html_content = """
+    <html>
+        <div id="productTitle">Test Product</div>
+        <span class="a-price-whole">1,234<span class="a-price-decimal">.</span></span>
+        <span class="a-price-fraction">56</span>
+    </html>
+    """
+    mock_response = MagicMock()
+    mock_response.iter_content.return_value = [html_content.encode('utf-8')]
+    mock_response.raise_for_status.return_value = None
+    mock_response.url = "http://example.com"
+    mock_get.return_value = mock_response
+
+    # Note: my code prefers .a-offscreen if available. Here it's not.
+    price, title, currency = get_amazon_price("http://example.com")
+    assert price == 1234.56
+
+@patch('backend.api.services.price_service.UserAgent')
+@patch('backend.api.services.price_service._session.get')
+def test_get_amazon_price_meta_fallback(mock_get, mock_ua):
+    # Mock HTML content with meta title
+    html_content = """
+    <html>
+        <meta name="title" content="Meta Title Product">
+        <span class="a-price"><span class="a-offscreen">$10.00</span></span>
+    </html>
+    """
+    mock_response = MagicMock()
+    mock_response.iter_content.return_value = [html_content.encode('utf-8')]
+    mock_response.raise_for_status.return_value = None
+    mock_response.url = "http://example.com"
+    mock_get.return_value = mock_response
+
+    price, title, currency = get_amazon_price("http://example.com")
+    assert title == "Meta Title Product"
+    assert price == 10.00
+
+@patch('backend.api.services.price_service.UserAgent')
+@patch('backend.api.services.price_service._session.get')
+def test_get_amazon_price_captcha(mock_get, mock_ua):
+    # Mock CAPTCHA page
+    html_content = """
+    <html>
+        <title>Robot Check</title>
+    </html>
+    """
+    mock_response = MagicMock()
+    mock_response.iter_content.return_value = [html_content.encode('utf-8')]
+    mock_response.raise_for_status.return_value = None
+    mock_response.url = "http://example.com"
+    mock_get.return_value = mock_response
+
+    # Recognized from the raw bytes, without building a parse tree
+    with patch.object(price_service, 'parse_amazon_html') as mock_parse:
+        price, title, currency = get_amazon_price("http://example.com")
+    assert price is None
+    assert title is None
+    mock_parse.assert_not_called()
+
+@patch('backend.api.services.price_service.UserAgent')
+@patch('backend.api.services.price_service._session.get')
+def test_get_amazon_price_fail(mock_get, mock_ua):
+    mock_get.side_effect = Exception("Network Error")
+    price, title, currency = get_amazon_price("http://example.com")
+    assert price is None
+    assert title is None
+    assert currency is None
+
+@patch('backend.api.services.price_service.UserAgent')
+@patch('backend.api.services.price_service._session.get')
+def test_get_amazon_price_unavailable_short_url(mock_get, mock_ua):
+    # Scenario: User tracks a short URL. ASIN is not in short URL.
+    # Item is unavailable (no core price).
+    # "Similar items" has a price (which we want to IGNORE).
+
+    html_content = """
+    <html>
+        <div id="productTitle">Miracle Grow Indoor Plant Food</div>
+        <div id="availability">
+            <span class="a-size-medium a-color-price">Currently unavailable.</span>
+        </div>
+        <!-- Similar items with price that should be ignored -->
+        <div id="similar-items">
             <span class="a-price">
-                <span class="a-offscreen">$19.99</span>
+                <span class="a-offscreen">$8.49</span>
             </span>
-        </html>
-        """
-        mock_response = MagicMock()
-        mock_response.content = html_content.encode('utf-8')
-        mock_response.raise_for_status.return_value = None
-        mock_response.url = "http://example.com"
-        mock_get.return_value = mock_response
-
-        price, title, currency = get_amazon_price("http://example.com")
-        self.assertEqual(price, 19.99)
-        self.assertEqual(title, "Test Product")
-        self.assertEqual(currency, "$")
-
-    @patch('backend.api.services.price_service.UserAgent')
-    @patch('requests.get')
-    def test_get_amazon_price_fraction(self, mock_get, mock_ua):
-        # Mock HTML content with whole/fraction
-        html_content = """
-        <html>
-            <div id="productTitle">Test Product</div>
-            <span class="a-price-whole">1,234<span class="a-price-decimal">.</span></span>
-            <span class="a-price-fraction">56</span>
-        </html>
-        """
-        mock_response = MagicMock()
-        mock_response.content = html_content.encode('utf-8')
-        mock_response.raise_for_status.return_value = None
-        mock_response.url = "http://example.com"
-        mock_get.return_value = mock_response
-
-        # Note: my code prefers .a-offscreen if available. Here it's not.
-        price, title, currency = get_amazon_price("http://example.com")
-        self.assertEqual(price, 1234.56)
-
-    @patch('backend.api.services.price_service.UserAgent')
-    @patch('requests.get')
-    def test_get_amazon_price_meta_fallback(self, mock_get, mock_ua):
-        # Mock HTML content with meta title
-        html_content = """
-        <html>
-            <meta name="title" content="Meta Title Product">
-            <span class="a-price"><span class="a-offscreen">$10.00</span></span>
-        </html>
-        """
-        mock_response = MagicMock()
-        mock_response.content = html_content.encode('utf-8')
-        mock_response.raise_for_status.return_value = None
-        mock_response.url = "http://example.com"
-        mock_get.return_value = mock_response
-
-        price, title, currency = get_amazon_price("http://example.com")
-        self.assertEqual(title, "Meta Title Product")
-        self.assertEqual(price, 10.00)
-
-    @patch('backend.api.services.price_service.UserAgent')
-    @patch('requests.get')
-    def test_get_amazon_price_captcha(self, mock_get, mock_ua):
-        # Mock CAPTCHA page
-        html_content = """
-        <html>
-            <title>Robot Check</title>
-        </html>
-        """
-        mock_response = MagicMock()
-        mock_response.content = html_content.encode('utf-8')
-        mock_response.raise_for_status.return_value = None
-        mock_response.url = "http://example.com"
-        mock_get.return_value = mock_response
-
-        price, title, currency = get_amazon_price("http://example.com")
-        self.assertIsNone(price)
-        self.assertIsNone(title)
-
-    @patch('backend.api.services.price_service.UserAgent')
-    @patch('requests.get')
-    def test_get_amazon_price_fail(self, mock_get, mock_ua):
-        mock_get.side_effect = Exception("Network Error")
-        price, title, currency = get_amazon_price("http://example.com")
-        self.assertIsNone(price)
-        self.assertIsNone(title)
-        self.assertIsNone(currency)
-
-    @patch('backend.api.services.price_service.UserAgent')
-    @patch('requests.get')
-    def test_get_amazon_price_unavailable_short_url(self, mock_get, mock_ua):
-        # Scenario: User tracks a short URL. ASIN is not in short URL.
-        # Item is unavailable (no core price).
-        # "Similar items" has a price (which we want to IGNORE).
-
-        html_content = """
-        <html>
-            <div id="productTitle">Miracle Grow Indoor Plant Food</div>
-            <div id="availability">
-                <span class="a-size-medium a-color-price">Currently unavailable.</span>
-            </div>
-            <!-- Similar items with price that should be ignored -->
-            <div id="similar-items">
-                <span class="a-price">
-                    <span class="a-offscreen">$8.49</span>
-                </span>
-            </div>
-        </html>
-        """
-        mock_response = MagicMock()
-        mock_response.content = html_content.encode('utf-8')
-        mock_response.raise_for_status.return_value = None
-        # Simulate redirect to full URL with ASIN
-        mock_response.url = "https://www.amazon.com/dp/B082BPQH6Z?th=1"
-        mock_get.return_value = mock_response
-
-        # Short URL
-        price, title, currency = get_amazon_price("https://a.co/d/0f4htW3j")
-
-        # Expectation: Price should be None because ASIN should be extracted from response.url,
-        # leading to strict checking which fails to find price in unavailable page,
-        # correctly ignoring the "Similar items" price.
-        self.assertIsNone(price)
-        self.assertEqual(title, "Miracle Grow Indoor Plant Food")
-
-if __name__ == '__main__':
-    unittest.main()
+        </div>
+    </html>
+    """
+    mock_response = MagicMock()
+    mock_response.iter_content.return_value = [html_content.encode('utf-8')]
+    mock_response.raise_for_status.return_value = None
+    # Simulate redirect to full URL with ASIN
+    mock_response.url = "https://www.amazon.com/dp/B082BPQH6Z?th=1"
+    mock_get.return_value = mock_response
+
+    # Short URL
+    price, title, currency = get_amazon_price("https://a.co/d/0f4htW3j")
+
+    # Expectation: Price should be None because ASIN should be extracted from response.url,
+    # leading to strict checking which fails to find price in unavailable page,
+    # correctly ignoring the "Similar items" price.
+    assert price is None
+    assert title == "Miracle Grow Indoor Plant Food"
+
+@patch('backend.api.services.price_service.UserAgent')
+@patch('backend.api.services.price_service._session.get')
+def test_get_amazon_price_undeclared_charset_is_utf8(mock_get, mock_ua):
+    mock_response = MagicMock()
+    mock_response.headers = {'Content-Type': 'text/html'}
+    mock_response.iter_content.return_value = ['<html><div id="productTitle">Café Crème</div></html>'.encode('utf-8')]
+    mock_response.url = "http://example.com"
+    mock_get.return_value = mock_response
+
+    price, title, currency = get_amazon_price("http://example.com")
+    assert title == "Café Crème"
+
+@patch('backend.api.services.price_service.UserAgent')
+@patch('backend.api.services.price_service._session.get')
+def test_stops_reading_after_price_block(mock_get, mock_ua):
+    chunks_read = []
+
+    def iter_content(size):
+        for chunk in [
+            b'<html><span id="productTitle">Test Product</span>',
+            b'<div id="corePrice_feature_div"><span class="a-price"><span class="a-offscreen">$5.00</span></span></div>',
+            b'<p>Rest of the page</p></html>',
+        ]:
+            chunks_read.append(chunk)
+            yield chunk
+
+    mock_response = MagicMock()
+    mock_response.iter_content.side_effect = iter_content
+    mock_response.url = "http://example.com"
+    mock_get.return_value = mock_response
+
+    price, title, currency = get_amazon_price("http://example.com")
+    assert price == 5.00
+    assert title == "Test Product"
+    assert len(chunks_read) == 2
+    mock_response.close.assert_called_once()
+
+@patch('backend.api.services.price_service.UserAgent')
+@patch('backend.api.services.price_service._session.get')
+def test_captcha_backs_off_host(mock_get, mock_ua):
+    captcha_response = MagicMock()
+    captcha_response.iter_content.side_effect = lambda size: [b"<html><title>Robot Check</title></html>"]
+    captcha_response.url = "http://example.com"
+    product_response = MagicMock()
+    product_response.iter_content.return_value = [b'<html><div id="productTitle">Test Product</div></html>']
+    product_response.url = "http://example.com"
+    mock_get.side_effect = [captcha_response, captcha_response, product_response]
+    price_service._host_backoff.clear()
+
+    get_amazon_price("http://example.com/1")
+    get_amazon_price("http://example.com/2")
+    assert price_service._host_backoff["example.com"] == 4
+
+    get_amazon_price("http://example.com/3")
+    assert price_service._host_backoff["example.com"] == 2
@@ -1,16 +1,19 @@
 import sys
 import unittest
 from unittest.mock import patch, call, MagicMock
-from datetime import datetime, timedelta
 import os
 
 # Add backend to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from backend.api.services.price_service import update_all_prices, cleanup_price_history
+from backend.api.services.price_service import update_all_prices, cleanup_price_history, check_new_item_price
+from backend.api.services import price_service
 
 class TestPriceTrackingLogic(unittest.TestCase):
 
+    def setUp(self):
+        price_service._price_cache.clear()
+
     @patch('backend.api.services.price_service.get_db_cursor')
     def test_cleanup_price_history(self, mock_get_db_cursor):
         """Test that cleanup job deletes duplicate daily records older than 24h."""
@@ -32,14 +35,12 @@ class TestPriceTrackingLogic(unittest.TestCase):
 
         # Mock Fetch Items
         mock_cursor.fetchall.side_effect = [
-            [('item_1', 'http://example.com/1', 'user1', None, None, 'Test Item', False)]
+            [('item_1', 'http://example.com/1', 'user1', None, None, 'Test Item', False)],
+            # Last price, different from the new price
+            [('item_1', 10.0)],
+            [],  # No webhooks
         ]
 
-        # Mock Fetch Last Price (Logic I added)
-        # Assuming query: SELECT price, recorded_at FROM price_history ... LIMIT 1
-        # Return an old price that is different from new price
-        mock_cursor.fetchone.return_value = (10.0, datetime.now() - timedelta(hours=1))
-
         # Mock New Price
         mock_get_price.return_value = (20.0, "Test Product", "$")
 
@@ -57,12 +58,12 @@ class TestPriceTrackingLogic(unittest.TestCase):
         mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
 
         mock_cursor.fetchall.side_effect = [
-            [('item_1', 'http://example.com/1', 'user1', None, None, 'Test Item', False)]
+            [('item_1', 'http://example.com/1', 'user1', None, None, 'Test Item', False)],
+            # Last price same as new
+            [('item_1', 10.0)],
+            [],
         ]
 
-        # Last price same as new, recorded just now (same day)
-        mock_cursor.fetchone.return_value = (10.0, datetime.now())
-
         mock_get_price.return_value = (10.0, "Test Product", "$")
 
         update_all_prices()
@@ -81,12 +82,11 @@ class TestPriceTrackingLogic(unittest.TestCase):
         mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
 
         mock_cursor.fetchall.side_effect = [
-            [('item_1', 'http://example.com/1', 'user1', None, None, 'Test Item', False)]
+            [('item_1', 'http://example.com/1', 'user1', None, None, 'Test Item', False)],
+            [('item_1', 10.0)],
+            [],
         ]
 
-        # Last price same, recorded yesterday (different day)
-        mock_cursor.fetchone.return_value = (10.0, datetime.now() - timedelta(days=1))
-
         mock_get_price.return_value = (10.0, "Test Product", "$")
 
         update_all_prices()
@@ -103,7 +103,9 @@ class TestPriceTrackingLogic(unittest.TestCase):
         mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
 
         mock_cursor.fetchall.side_effect = [
-            [('item_1', 'http://example.com/1', 'user1', None, None, 'Test Item', False)]
+            [('item_1', 'http://example.com/1', 'user1', None, None, 'Test Item', False)],
+            [],
+            [],
         ]
 
         # Price fetch fails (returns None)
@@ -122,5 +124,44 @@ class TestPriceTrackingLogic(unittest.TestCase):
         self.assertFalse(any("current_price =" in c for c in execute_calls),
                          "Should not update current_price on failure")
 
+    @patch('backend.api.services.price_service.get_db_cursor')
+    @patch('backend.api.services.price_service.get_amazon_price')
+    def test_shared_url_fetched_once(self, mock_get_price, mock_get_db_cursor):
+        """Items tracking the same URL share one scrape, including on the next run."""
+        mock_cursor = MagicMock()
+        mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
+
+        items = [
+            ('item_1', 'http://example.com/1', 'user1', None, None, 'Test Item', False),
+            ('item_2', 'http://example.com/1', 'user2', None, None, 'Test Item', False),
+        ]
+        mock_cursor.fetchall.side_effect = [items, [], [], items, [], []]
+        mock_get_price.return_value = (20.0, "Test Product", "$")
+
+        update_all_prices()
+        update_all_prices()
+
+        mock_get_price.assert_called_once_with('http://example.com/1')
+        update_calls = [c for c in mock_cursor.execute.call_args_list if "SET current_price" in str(c)]
+        self.assertEqual([c.args[1][0] for c in update_calls], [['item_1', 'item_2']] * 2)
+
+    @patch('backend.api.services.price_service.get_db_cursor')
+    @patch('backend.api.services.price_service.get_amazon_price')
+    def test_check_new_item_price(self, mock_get_price, mock_get_db_cursor):
+        """A new item's first scrape updates the item and adds its first history row together."""
+        mock_cursor = MagicMock()
+        mock_get_db_cursor.return_value.__enter__.return_value = mock_cursor
+
+        mock_get_price.return_value = (25.0, "Test Product", "$")
+
+        check_new_item_price('item_1', 'http://example.com/1')
+
+        self.assertEqual(mock_cursor.execute.call_count, 1)
+        sql, params = mock_cursor.execute.call_args[0]
+        self.assertIn("UPDATE tracked_items", sql)
+        self.assertIn("INSERT INTO price_history", sql)
+        self.assertIn("WHEN is_custom_name THEN name", sql)
+        self.assertEqual(params, (25.0, "$", "Test Product", 'item_1'))
+
 if __name__ == '__main__':
     unittest.main()
@@ -18,4 +18,4 @@ flask seed-admin
 # This is important for proper signal handling (e.g., stopping the container).
 echo "Starting Gunicorn server..."
 export SCHEDULER_AUTOSTART=True
-exec gunicorn --bind 0.0.0.0:5001 --workers 4 --worker-class gevent --timeout 120 "backend.api:create_app()"
+exec gunicorn --bind 0.0.0.0:5001 --workers 4 --worker-class gevent --worker-connections 1000 --keep-alive 5 --timeout 120 "backend.api:create_app()"
@@ -76,6 +76,25 @@ const PriceTrackingPage = () => {
         }
     };
 
+    // The price and name of a new item are fetched in the background after it's
+    // added; poll its details until they've been recorded (last_checked is set).
+    const waitForInitialPrice = async (itemId) => {
+        for (let attempt = 0; attempt < 30; attempt++) {
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            try {
+                const response = await apiClient.get(`/api/tracked-items/${itemId}?range=24h`);
+                if (response.data.last_checked) {
+                    const { history, ...checkedItem } = response.data;
+                    setItems(currentItems => currentItems.map(item => item.id === itemId ? { ...item, ...checkedItem } : item));
+                    return;
+                }
+            } catch (error) {
+                // The item may have been deleted in the meantime.
+                return;
+            }
+        }
+    };
+
     const handleAddItem = async (e) => {
         e.preventDefault();
         if (!newItemUrl) return;
@@ -93,6 +112,7 @@ const PriceTrackingPage = () => {
             setItems([response.data, ...items]);
             setNewItemUrl('');
             toast.success("Item added successfully!");
+            waitForInitialPrice(response.data.id);
 
             // Update user defaults in background
             try {
@@ -450,7 +470,7 @@ const PriceTrackingPage = () => {
                                         <div className="flex items-center gap-6">
                                             <div className="text-right">
                                                 <div className={`text-lg font-bold ${isItemOnSale(item) ? 'text-success' : 'text-text-primary'}`}>
-                                                    {item.currency}{item.current_price}
+                                                    {item.last_checked ? <>{item.currency}{item.current_price}</> : 'Checking price...'}
                                                 </div>
                                                 {isItemOnSale(item) && (
                                                     <div className="text-sm text-text-muted line-through">
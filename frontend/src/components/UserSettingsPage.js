@@ -63,27 +63,59 @@ const UserSettingsPage = () => {
         }
     }, [currentJobId]);
 
-    // Effect to manage the polling interval based on the isPolling state
+    // Effect to follow the running job while isPolling is set. Updates are streamed
+    // over server-sent events where possible, falling back to interval polling.
     useEffect(() => {
-        if (isPolling) {
+        let eventSource = null;
+
+        const startPolling = () => {
             // Clear any existing interval before starting a new one.
             if (pollingIntervalRef.current) {
                 clearInterval(pollingIntervalRef.current);
             }
             pollingIntervalRef.current = setInterval(pollImportStatus, 3000);
+        };
+
+        if (isPolling) {
+            const authData = JSON.parse(localStorage.getItem('userInfo') || '{}');
+            if (window.EventSource && currentJobId && authData.token) {
+                // EventSource can't send headers, so the JWT goes in the query string.
+                const params = new URLSearchParams({ job_id: currentJobId, token: authData.token });
+                eventSource = new EventSource(`${apiClient.defaults.baseURL}/api/ingestion/manual/stream?${params}`);
+                eventSource.onmessage = (event) => {
+                    const job = JSON.parse(event.data);
+                    setJobDetails(job);
+                    if (job.status === 'completed' || job.status === 'failed') {
+                        eventSource.close();
+                        setIsPolling(false);
+                        setCurrentJobId(null); // Reset job ID when done
+                    }
+                };
+                eventSource.onerror = () => {
+                    // The stream is unavailable or dropped; poll the status endpoint instead.
+                    eventSource.close();
+                    startPolling();
+                };
+            } else {
+                startPolling();
+            }
         } else {
             if (pollingIntervalRef.current) {
                 clearInterval(pollingIntervalRef.current);
                 pollingIntervalRef.current = null;
             }
         }
-        // Cleanup function to clear interval on component unmount
+        // Cleanup function to close the stream and clear the interval on unmount
         return () => {
+            if (eventSource) {
+                eventSource.close();
+            }
             if (pollingIntervalRef.current) {
                 clearInterval(pollingIntervalRef.current);
+                pollingIntervalRef.current = null;
             }
         };
-    }, [isPolling, pollImportStatus]);
+    }, [isPolling, currentJobId, pollImportStatus]);
 
     // Effect for handling job status changes and notifications
     useEffect(() => {